@@ -0,0 +1,128 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import UUID
+
+from artifact.artifact_store import ArtifactStore
+from storage.storage import Storage
+from story.story_repository import StoryRepository
+from config import VIDEOS_DIR
+
+STORY_ID_BATCH_SIZE = 1000
+
+class ArtifactCollector:
+    """Periodically reclaims media that no story references anymore.
+
+    Unreferenced blobs are removed from the artifact store, and node videos,
+    thumbnails and path videos are removed once their story has been deleted.
+    Files younger than the grace period are kept, since a node's media is written
+    before the node itself is persisted. Only the stories named by media past the
+    grace period are looked up, in batches. Path videos are cached under a key of the
+    node videos they were built from, so those built before a node was re-rendered
+    are never requested again. The oldest are removed once the cache is over
+    path_video_cache_max_bytes.
+    """
+
+    def __init__(
+        self,
+        artifact_store: ArtifactStore,
+        storage: Storage,
+        story_repository: StoryRepository,
+        interval: float,
+        grace_period: timedelta,
+        path_video_cache_max_bytes: int
+    ):
+        self.artifact_store = artifact_store
+        self.storage = storage
+        self.interval = interval
+        self.grace_period = grace_period
+        self.path_video_cache_max_bytes = path_video_cache_max_bytes
+        self.story_repository = story_repository
+        self.logger = logging.getLogger(__name__)
+
+    def _get_story_id(self, name: str) -> UUID | None:
+        try:
+            return UUID(name.rsplit("/", 1)[-1].split("_", 1)[0])
+        except ValueError:
+            return None
+
+    async def _find_deleted_story_ids(self, story_ids: set[UUID]) -> set[UUID]:
+        ids = list(story_ids)
+        deleted_ids = set(story_ids)
+        for start in range(0, len(ids), STORY_ID_BATCH_SIZE):
+            deleted_ids -= await self.story_repository.find_existing_ids(ids[start:start + STORY_ID_BATCH_SIZE])
+        return deleted_ids
+
+    async def _collect_videos(self) -> int:
+        modified_before = datetime.now(timezone.utc) - self.grace_period
+        candidates = []
+        for stored_object in await self.storage.list("videos/"):
+            story_id = self._get_story_id(stored_object.key)
+            if story_id is not None and stored_object.last_modified < modified_before:
+                candidates.append((stored_object, story_id))
+
+        deleted_ids = await self._find_deleted_story_ids({story_id for _, story_id in candidates})
+        freed_bytes = 0
+        for stored_object, story_id in candidates:
+            if story_id not in deleted_ids:
+                continue
+            await self.storage.delete(stored_object.key)
+            freed_bytes += stored_object.size
+        return freed_bytes
+
+    async def _collect_path_videos(self) -> int:
+        modified_before = datetime.now(timezone.utc) - self.grace_period
+        path_videos = sorted(await self.storage.list("videos/paths/"), key=lambda stored_object: stored_object.last_modified, reverse=True)
+        cached_bytes = 0
+        freed_bytes = 0
+        for stored_object in path_videos:
+            cached_bytes += stored_object.size
+            if cached_bytes <= self.path_video_cache_max_bytes or stored_object.last_modified >= modified_before:
+                continue
+            await self.storage.delete(stored_object.key)
+            freed_bytes += stored_object.size
+        return freed_bytes
+
+    def _find_thumbnails(self) -> list[tuple[Path, UUID]]:
+        modified_before = time.time() - self.grace_period.total_seconds()
+        thumbnails = []
+        for path in VIDEOS_DIR.glob("*.webp"):
+            story_id = self._get_story_id(path.name)
+            if story_id is not None and path.stat().st_mtime < modified_before:
+                thumbnails.append((path, story_id))
+        return thumbnails
+
+    def _delete_files(self, paths: list[Path]) -> int:
+        freed_bytes = 0
+        for path in paths:
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            path.unlink(missing_ok=True)
+            freed_bytes += size
+        return freed_bytes
+
+    async def _collect_thumbnails(self) -> int:
+        thumbnails = await asyncio.to_thread(self._find_thumbnails)
+        deleted_ids = await self._find_deleted_story_ids({story_id for _, story_id in thumbnails})
+        return await asyncio.to_thread(self._delete_files, [path for path, story_id in thumbnails if story_id in deleted_ids])
+
+    async def collect(self) -> int:
+        freed_bytes = await self.artifact_store.collect_garbage(self.grace_period)
+        story_media_bytes = await self._collect_videos()
+        story_media_bytes += await self._collect_thumbnails()
+        self.logger.info(f"Collected {story_media_bytes} bytes of media from deleted stories")
+        path_video_bytes = await self._collect_path_videos()
+        self.logger.info(f"Evicted {path_video_bytes} bytes of cached path videos")
+        return freed_bytes + story_media_bytes + path_video_bytes
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.collect()
+            except Exception as e:
+                self.logger.error(f"Artifact collection failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
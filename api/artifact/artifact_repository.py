@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from typing import Iterable
+from pymongo import UpdateOne
+
+from database.database import Database
+
+class ArtifactRepository:
+    """Records which nodes reference each stored artifact blob."""
+
+    def __init__(self, database: Database):
+        self.collection = database.db.artifacts
+
+    async def add_references(self, keys: Iterable[str], story_id: str, node_id: str) -> None:
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"key": key},
+                {
+                    "$addToSet": {"references": {"story_id": story_id, "node_id": node_id}},
+                    "$set": {"updated_at": now},
+                },
+                upsert=True
+            )
+            for key in set(keys)
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def remove_references(self, keys: Iterable[str], story_id: str, node_id: str) -> None:
+        await self.collection.update_many(
+            {"key": {"$in": list(set(keys))}},
+            {
+                "$pull": {"references": {"story_id": story_id, "node_id": node_id}},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            }
+        )
+
+    async def remove_story_references(self, story_id: str) -> int:
+        result = await self.collection.update_many(
+            {"references.story_id": story_id},
+            {
+                "$pull": {"references": {"story_id": story_id}},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            }
+        )
+        return result.modified_count
+
+    async def find_unreferenced(self, updated_before: datetime) -> list[str]:
+        cursor = self.collection.find(
+            {"references": {"$size": 0}, "updated_at": {"$lt": updated_before}},
+            {"key": 1}
+        )
+        return [artifact["key"] async for artifact in cursor]
+
+    async def delete_unreferenced(self, key: str, updated_before: datetime) -> bool:
+        result = await self.collection.delete_one(
+            {"key": key, "references": {"$size": 0}, "updated_at": {"$lt": updated_before}}
+        )
+        return result.deleted_count > 0
@@ -0,0 +1,114 @@
+import os
+import asyncio
+import re
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable
+
+from artifact.artifact_repository import ArtifactRepository
+from artifact.exceptions import ArtifactNotFoundError
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[0-9a-z]+)?$")
+
+class ArtifactStore:
+    """Content-addressed storage for the intermediate media of generated nodes.
+
+    Blobs are named by the sha256 of their content, so identical outputs are stored
+    once. The nodes referencing each blob are recorded, and blobs left without
+    references are reclaimed by collect_garbage once the grace period has passed.
+    """
+
+    def __init__(self, root: str | os.PathLike, repository: ArtifactRepository):
+        self.root = Path(root)
+        self.repository = repository
+        self.logger = logging.getLogger(__name__)
+
+    def _get_path(self, key: str) -> Path:
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid artifact key {key}")
+        return self.root / key[:2] / key
+
+    def _get_key(self, source_path: str) -> str:
+        with open(source_path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        return f"{digest}{Path(source_path).suffix.lower()}"
+
+    def _get_keys(self, root: Path, paths: Iterable[str]) -> dict[str, str]:
+        return {path: self._get_key(str(root / path)) for path in paths}
+
+    def _put(self, source_path: str, key: str) -> None:
+        path = self._get_path(key)
+        if path.exists():
+            os.utime(path)
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(prefix=f".{key}.", dir=path.parent)
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, partial_path)
+            os.replace(partial_path, path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+    async def store(self, root: Path, paths: Iterable[str], story_id: str, node_id: str) -> dict[str, str]:
+        """Stores the files at the given paths under root for the node and returns their keys by path.
+
+        The node's references are recorded before the blobs are written, so a blob is
+        never left on disk without a record for collect_garbage to find. Identical
+        blobs are stored once.
+        """
+        keys = await asyncio.to_thread(self._get_keys, root, paths)
+        await self.repository.add_references(keys.values(), story_id, node_id)
+        for path, key in keys.items():
+            await asyncio.to_thread(self._put, str(root / path), key)
+        return keys
+
+    def fetch(self, key: str, output_path: str) -> None:
+        try:
+            shutil.copyfile(self._get_path(key), output_path)
+        except FileNotFoundError:
+            raise ArtifactNotFoundError(f"Artifact {key} not found")
+
+    async def remove_references(self, keys: Iterable[str], story_id: str, node_id: str) -> None:
+        await self.repository.remove_references(keys, story_id, node_id)
+
+    async def release_story(self, story_id: str) -> None:
+        released = await self.repository.remove_story_references(story_id)
+        self.logger.info(f"Released {released} artifacts referenced by story {story_id}")
+
+    def _delete_blob(self, key: str, modified_before: float) -> int:
+        path = self._get_path(key)
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            return 0
+        if stat_result.st_mtime >= modified_before:
+            return 0
+        path.unlink(missing_ok=True)
+        return stat_result.st_size
+
+    async def collect_garbage(self, grace_period: timedelta) -> int:
+        """Deletes blobs no node has referenced for the grace period and returns the bytes freed.
+
+        A blob stored again while it is being collected has its mtime refreshed by
+        store, so the file is kept even if its reference record was just removed.
+        """
+        cutoff = datetime.now(timezone.utc) - grace_period
+        modified_before = time.time() - grace_period.total_seconds()
+        freed_bytes = 0
+        deleted = 0
+        for key in await self.repository.find_unreferenced(cutoff):
+            if not await self.repository.delete_unreferenced(key, cutoff):
+                continue
+            freed_bytes += self._delete_blob(key, modified_before)
+            deleted += 1
+        self.logger.info(f"Collected {deleted} unreferenced artifacts, freeing {freed_bytes} bytes")
+        return freed_bytes
@@ -9,16 +9,29 @@ class SoundEffectType(StrEnum):
     AMBIENT = "ambient"
 
 class Audio:
-    def __init__(self, clip: AudioFileClip):
-        self.clip = clip
+    """An audio file on disk. Clips are only opened on demand, by whoever closes them."""
+
+    def __init__(self, path: str, duration: float, start: float = 0):
+        self.path = path
+        self.duration = duration
+        self.start = start
+
+    def open_clip(self) -> AudioFileClip:
+        return AudioFileClip(self.path).with_start(self.start)
+
+    @staticmethod
+    def read_duration(path: str) -> float:
+        with AudioFileClip(path) as clip:
+            return clip.duration
 
 class LineAudio(Audio):
-    def __init__(self, clip: AudioFileClip, transcription: list[TranscriptionWord], type: LineType):
-        super().__init__(clip)
+    def __init__(self, path: str, duration: float, transcription: list[TranscriptionWord], type: LineType):
+        super().__init__(path, duration)
         self.transcription = transcription
         self.type = type
 
 class SoundEffectAudio(Audio):
-    def __init__(self, clip: AudioFileClip, type: SoundEffectType):
+    def __init__(self, path: str, duration: float, start: float, type: SoundEffectType, description: str = ""):
         self.type = type
-        super().__init__(clip)
\ No newline at end of file
+        self.description = description
+        super().__init__(path, duration, start)
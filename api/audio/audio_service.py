@@ -1,6 +1,5 @@
 import logging
 import asyncio
-import os
 from typing import Literal
 
 from tts.tts import TTS, SpeechGenerationOptions, SoundEffectGenerationOptions
@@ -11,9 +10,7 @@ from story.story import Subject, Character
 from audio.exceptions import AudioGenerationError
 from audio.audio import LineAudio, SoundEffectAudio, SoundEffectType
 from common.base_model_no_extra import BaseModelNoExtra
-from utils.utils import generate_random_string, exponential_backoff_call
-
-from moviepy.audio.io.AudioFileClip import AudioFileClip
+from utils.utils import exponential_backoff_call
 
 class SoundDescriptionRespone(BaseModelNoExtra):
     description: str
@@ -33,7 +30,7 @@ class AudioService:
         self.semaphore = asyncio.Semaphore(max_concurrent_requests)
 
     def _format_line_audio_for_sound_effects_desctiption_prompt(self, line_audio: LineAudio) -> str:
-        line_start = line_audio.clip.start
+        line_start = line_audio.start
         return ", ".join([f'({word.text}, {word.start+line_start}, {word.end+line_start})' for word in line_audio.transcription])
 
     def _get_sound_effects_description_prompt(self, lines_audios: list[LineAudio]) -> str:
@@ -77,7 +74,7 @@ Your task is to output a JSON. Each element must include:
 
 '''
 
-    async def _generate_sound_effect_audio(self, description_response: SoundDescriptionRespone, audio_file_path: str) -> SoundEffectAudio:
+    async def generate_sound_effect_audio(self, description_response: SoundDescriptionRespone, audio_file_path: str) -> SoundEffectAudio:
         try:
             async with self.semaphore:
                 duration = min(max(description_response.end_time-description_response.start_time, 0.5), 22)
@@ -90,18 +87,21 @@ Your task is to output a JSON. Each element must include:
 
                 self.logger.info(f"Saved sound effect audio file to")
 
-                clip = AudioFileClip(audio_file_path).with_start(description_response.start_time)
+                clip_duration = SoundEffectAudio.read_duration(audio_file_path)
 
-                self.logger.info(f'Generated sound effect for:\nDescription: {description_response.description}\nStart time: {description_response.start_time}\nEnd time: {description_response.end_time}\nType: {description_response.type}\n With duration {clip.duration}')
+                self.logger.info(f'Generated sound effect for:\nDescription: {description_response.description}\nStart time: {description_response.start_time}\nEnd time: {description_response.end_time}\nType: {description_response.type}\n With duration {clip_duration}')
 
                 return SoundEffectAudio(
-                    clip=clip,
-                    type=description_response.type
+                    path=audio_file_path,
+                    duration=clip_duration,
+                    start=description_response.start_time,
+                    type=description_response.type,
+                    description=description_response.description
                 )
         except Exception as e:
             raise AudioGenerationError(f"Failed to generate sound effect audio: {str(e)}")
 
-    async def generate_sound_effects_audios(self, lines_audios: list[LineAudio], scene_base64_image: str, dir_path: str) -> list[SoundEffectAudio]:
+    async def describe_sound_effects(self, lines_audios: list[LineAudio], scene_image_url: str) -> list[SoundDescriptionRespone]:
         chat = Chat()
         prompt = self._get_sound_effects_description_prompt(lines_audios)
         chat.add_user_message([
@@ -111,24 +111,15 @@ Your task is to output a JSON. Each element must include:
             },
             {
                 "type": "input_image",
-                "image_url": f"data:image/jpeg;base64,{scene_base64_image}",
+                "image_url": scene_image_url,
                 "detail": "low"
             }
         ])
         chat_options = ChatOptions(response_format=SoundEffectsDescriptionsResponse)
         sound_effects_desctiptions_response: SoundEffectsDescriptionsResponse = await self.ttt.chat(chat, chat_options)
+        self.logger.info(f"Described {len(sound_effects_desctiptions_response.sound_effects_descriptions)} sound effects")
 
-        tasks = [
-            self._generate_sound_effect_audio(
-                sound_effect_description,
-                os.path.join(dir_path, f"{generate_random_string()}.mp3")
-            )
-            for i, sound_effect_description in enumerate(sound_effects_desctiptions_response.sound_effects_descriptions)
-        ]
-        sound_effects_audios = await asyncio.gather(*tasks)
-        self.logger.info(f"Generated {len(sound_effects_audios)} sound effects audios")
-
-        return sound_effects_audios
+        return sound_effects_desctiptions_response.sound_effects_descriptions
 
     async def generate_line_audio(self, line: Line, language: str, subjects: dict[str, Subject], audio_file_path: str) -> LineAudio:
         characters = [subject for subject in subjects.values() if isinstance(subject, Character)]
@@ -140,7 +131,10 @@ Your task is to output a JSON. Each element must include:
                     if not character.voice_id:
                         self.logger.info(f"Getting voice for character {character.name}")
                         used_voices = set([c.voice_id for c in characters if c.voice_id is not None])
-                        character.voice_id = await self.tts.get_voice(language, used_voices, character)
+                        voice_id = await self.tts.get_voice(language, used_voices, character)
+                        # Replaced rather than updated, as the character may be shared with the node's ancestors
+                        character = character.model_copy(update={"voice_id": voice_id})
+                        subjects[str(line.character_id)] = character
                     options.voice = character.voice_id
                 else:
                     options.voice = await exponential_backoff_call(self.tts.get_voice, language, [], None)
@@ -156,7 +150,8 @@ Your task is to output a JSON. Each element must include:
                 transctiption = await self.stt.transcribe(audio_file_path)
 
                 return LineAudio(
-                    clip=AudioFileClip(audio_file_path),
+                    path=audio_file_path,
+                    duration=LineAudio.read_duration(audio_file_path),
                     transcription=transctiption,
                     type=line.type
                 )
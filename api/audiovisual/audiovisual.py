@@ -0,0 +1,22 @@
+from audiovisual.render_workspace import RenderWorkspace
+from story.artifacts import SceneArtifacts
+
+class ComposedVideo:
+    """The generated scenes of a node, ready to be encoded.
+
+    Only the scene files in the workspace are kept. The clips reading them are
+    opened for each encode, so no ffmpeg reader stays open between renders.
+    """
+
+    def __init__(
+        self,
+        workspace: RenderWorkspace,
+        thumbnail: bytes,
+        scenes_artifacts: list[SceneArtifacts],
+        artifact_paths: list[str]
+    ):
+        self.workspace = workspace
+        self.thumbnail = thumbnail
+        self.scenes_artifacts = scenes_artifacts
+        self.artifact_paths = artifact_paths
+        self.superseded = False
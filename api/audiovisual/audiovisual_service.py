@@ -1,109 +1,473 @@
-import logging
 import os
-import tempfile
+import logging
 import asyncio
+from pathlib import Path
+from typing import Awaitable, Callable, Coroutine, Optional
 
+from moviepy.video.VideoClip import VideoClip
 from moviepy.video.compositing.CompositeVideoClip import concatenate_videoclips
 from moviepy.audio.AudioClip import CompositeAudioClip
 from moviepy.audio.io.AudioFileClip import AudioFileClip
 from moviepy.audio.fx import AudioFadeIn, AudioFadeOut, MultiplyVolume
 
 from visual.visual_service import VisualService
-from visual.visual import Visual
+from visual.image_asset import ImageAsset
 from visual.exceptions import ImageGenerationError
-from story.story import Style, Subject
-from story.story import StoryNode
+from story.story import Style, Subject, SceneRegenerationTarget
+from story.story import StoryNode, VideoQuality
+from story.artifacts import SceneArtifacts, LineArtifact, SoundEffectArtifact
 from script.script import Scene
-from audio.audio_service import AudioService, LineAudio, SoundEffectAudio
+from audio.audio_service import AudioService, LineAudio, SoundEffectAudio, SoundDescriptionRespone
+from audio.audio import Audio
 from audio.exceptions import AudioGenerationError
-from audiovisual.exceptions import VideoGenerationError
+from audiovisual.exceptions import VideoGenerationError, WorkspaceQuotaExceededError
+from audiovisual.audiovisual import ComposedVideo
+from audiovisual.node_checkpoint import NodeCheckpoint
+from audiovisual.render_workspace import RenderWorkspace, WorkspaceManager
+from audiovisual.render_profile import RenderProfile, RENDER_PROFILES
+from audiovisual.render_resources import ReaderLimiter, RenderResources, RssMonitor
+from artifact.artifact_store import ArtifactStore
+from storage.storage import Storage
+from artifact.exceptions import ArtifactNotFoundError
+from config import VIDEO_EXTENSION, MAX_OPEN_AUDIO_READERS
+from utils.keyed_lock import KeyedLock
 
 class AudioVisualService:
-    def __init__(self, visual_service: VisualService, audio_service: AudioService):
+    def __init__(
+        self,
+        visual_service: VisualService,
+        audio_service: AudioService,
+        workspace_manager: WorkspaceManager,
+        artifact_store: ArtifactStore,
+        storage: Storage,
+        max_open_audio_readers: int = MAX_OPEN_AUDIO_READERS
+    ):
         self.visual_service = visual_service
         self.audio_service = audio_service
+        self.workspace_manager = workspace_manager
+        self.artifact_store = artifact_store
+        self.storage = storage
         self.logger = logging.getLogger(__name__)
+        self.reader_limiter = ReaderLimiter(max_open_audio_readers)
+        self.upload_locks = KeyedLock()
+
+    def _get_audio_fade_duration(self, audio: Audio) -> float:
+        return max(min(0.1 * audio.duration, 2), 0.2)
 
-    def _get_audio_fade_duration(self, clip: AudioFileClip) -> float:
-        return max(min(0.1 * clip.duration, 2), 0.2)
+    def _get_scene_dir(self, scene_id: int) -> str:
+        return f"scenes/{scene_id}"
 
-    async def _generate_sound_effects_audios(self, lines_audios: list[LineAudio], scene_base64_image: str, output_path: str) -> list[SoundEffectAudio]:
-        os.makedirs(output_path, exist_ok=True)
-        sound_effects_audios = await self.audio_service.generate_sound_effects_audios(lines_audios, scene_base64_image, output_path)
-        return sound_effects_audios
+    def _get_relative_path(self, workspace: RenderWorkspace, path: str) -> str:
+        return Path(path).relative_to(workspace.root).as_posix()
+
+    def _to_line_artifact(self, line_audio: LineAudio, workspace: RenderWorkspace) -> LineArtifact:
+        return LineArtifact(
+            path=self._get_relative_path(workspace, line_audio.path),
+            duration=line_audio.duration,
+            start=line_audio.start,
+            transcription=line_audio.transcription,
+            type=line_audio.type
+        )
+
+    def _to_line_audio(self, line_artifact: LineArtifact, workspace: RenderWorkspace) -> LineAudio:
+        line_audio = LineAudio(
+            path=str(workspace.root / line_artifact.path),
+            duration=line_artifact.duration,
+            transcription=line_artifact.transcription,
+            type=line_artifact.type
+        )
+        line_audio.start = line_artifact.start
+        return line_audio
+
+    def _to_sound_effect_audio(self, sound_effect_artifact: SoundEffectArtifact, workspace: RenderWorkspace) -> SoundEffectAudio:
+        return SoundEffectAudio(
+            path=str(workspace.root / sound_effect_artifact.path),
+            duration=sound_effect_artifact.duration,
+            start=sound_effect_artifact.start,
+            type=sound_effect_artifact.type,
+            description=sound_effect_artifact.description
+        )
 
-    async def _generate_scene_lines_audios(self, scene: Scene, language: str, subjects: dict[str, Subject], output_path: str) -> list[LineAudio]:
-        os.makedirs(output_path, exist_ok=True)
-        lines_tasks = [
-            self.audio_service.generate_line_audio(line, language, subjects, os.path.join(output_path, f"{scene.id}_{i}.mp3"))
-            for i, line in enumerate(scene.lines)
+    def _get_artifact_paths(self, scene_artifacts: SceneArtifacts) -> list[str]:
+        paths = [
+            scene_artifacts.image_path,
+            *[line.path for line in scene_artifacts.lines if line is not None],
+            *[sound_effect.path for sound_effect in scene_artifacts.sound_effects or []],
+            scene_artifacts.audio_path
         ]
-        lines_audio = await asyncio.gather(*lines_tasks)
+        return [path for path in paths if path is not None]
 
+    def _get_required_paths(self, scene_artifacts: SceneArtifacts) -> list[str]:
+        """Returns the stored artifacts the remaining stages of the scene and the assembly need."""
+        if scene_artifacts.image_path is not None and scene_artifacts.audio_path is not None:
+            return [scene_artifacts.image_path, scene_artifacts.audio_path]
+        return self._get_artifact_paths(scene_artifacts)
+
+    def _set_lines_starts(self, lines: list[LineArtifact]) -> None:
         last_line_end = 0
-        for line_audio in lines_audio:
-            line_audio.clip = line_audio.clip.with_start(last_line_end)
-            last_line_end = last_line_end + line_audio.clip.duration
-
-        return lines_audio
-    
-    async def _generate_scene_visual(self, scene: Scene, style: Style, output_path: str) -> Visual:
-        os.makedirs(output_path, exist_ok=True)
-        image_path = os.path.join(output_path, f"{scene.id}.png")
-        return await self.visual_service.generate_scene_visual(scene, style, image_path)
-    
-    async def _generate_scenes(self, scene: Scene, language: str, style: Style, subjects: dict[str, Subject], output_path: str) -> Visual:
-        visual, lines_audio =  await asyncio.gather(
-            self._generate_scene_visual(scene, style, os.path.join(output_path, "images")),
-            self._generate_scene_lines_audios(scene, language, subjects, os.path.join(output_path, "audio"))
+        for line in lines:
+            line.start = last_line_end
+            last_line_end = last_line_end + line.duration
+
+    async def _gather_stage(self, tasks: list[Coroutine]) -> list:
+        """Runs every task of a stage to completion, so the outputs of those that succeed are kept, then raises the first error."""
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        return results
+
+    async def _ensure_scene_image(self, scene: Scene, style: Style, prompts: Awaitable[dict[int, str]], scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint, regenerate: bool = False) -> ImageAsset:
+        workspace = checkpoint.workspace
+        if scene_artifacts.image_path is not None:
+            return ImageAsset.from_file(str(workspace.root / scene_artifacts.image_path))
+
+        image_path = workspace.path(self._get_scene_dir(scene.id), "image.png")
+        prompt = (await prompts).get(scene.id)
+        image = await self.visual_service.generate_scene_image(scene, style, image_path, prompt, regenerate)
+        workspace.track(image_path)
+
+        scene_artifacts.image_path = self._get_relative_path(workspace, image_path)
+        await checkpoint.commit(scene_artifacts, [scene_artifacts.image_path])
+        return image
+
+    async def _generate_line(self, scene: Scene, line_index: int, language: str, subjects: dict[str, Subject], scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint) -> None:
+        workspace = checkpoint.workspace
+        line_path = workspace.path(self._get_scene_dir(scene.id), "lines", f"{line_index}.mp3")
+        line_audio = await self.audio_service.generate_line_audio(scene.lines[line_index], language, subjects, line_path)
+        workspace.track(line_audio.path)
+
+        scene_artifacts.lines[line_index] = self._to_line_artifact(line_audio, workspace)
+        await checkpoint.commit(scene_artifacts, [scene_artifacts.lines[line_index].path])
+
+    async def _ensure_scene_lines(self, scene: Scene, language: str, subjects: dict[str, Subject], scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint) -> None:
+        await self._gather_stage([
+            self._generate_line(scene, i, language, subjects, scene_artifacts, checkpoint)
+            for i, line in enumerate(scene_artifacts.lines) if line is None
+        ])
+        self._set_lines_starts(scene_artifacts.lines)
+
+    async def _generate_sound_effect(self, sound_effect_index: int, scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint) -> None:
+        workspace = checkpoint.workspace
+        sound_effect = scene_artifacts.sound_effects[sound_effect_index]
+        description = SoundDescriptionRespone(
+            description=sound_effect.description,
+            start_time=sound_effect.start,
+            end_time=sound_effect.end,
+            type=sound_effect.type
         )
-        sound_effects_audios = await self._generate_sound_effects_audios(lines_audio, visual.base64_image, os.path.join(output_path, "audio"))
+        sound_effect_path = workspace.path(self._get_scene_dir(scene_artifacts.scene_id), "effects", f"{sound_effect_index}.mp3")
+        sound_effect_audio = await self.audio_service.generate_sound_effect_audio(description, sound_effect_path)
+        workspace.track(sound_effect_audio.path)
 
-        lines_audio_clip = CompositeAudioClip([line_audio.clip for line_audio in lines_audio])
-        sound_effects_audio_clip = CompositeAudioClip([audio.clip.with_effects([
-            MultiplyVolume(0.6), 
-            AudioFadeIn(self._get_audio_fade_duration(audio.clip)), 
-            AudioFadeOut(self._get_audio_fade_duration(audio.clip))
-        ]) for audio in sound_effects_audios])
-        audio_clip = CompositeAudioClip([lines_audio_clip, sound_effects_audio_clip])
+        sound_effect.path = self._get_relative_path(workspace, sound_effect_audio.path)
+        sound_effect.duration = sound_effect_audio.duration
+        await checkpoint.commit(scene_artifacts, [sound_effect.path])
 
-        visual.clip = visual.clip.with_duration(audio_clip.duration).with_audio(audio_clip)
+    async def _ensure_scene_sound_effects(self, image: ImageAsset, scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint) -> None:
+        workspace = checkpoint.workspace
+        if scene_artifacts.sound_effects is None:
+            lines_audio = [self._to_line_audio(line, workspace) for line in scene_artifacts.lines]
+            descriptions = await self.audio_service.describe_sound_effects(lines_audio, image.get_vision_data_url())
+            scene_artifacts.sound_effects = [
+                SoundEffectArtifact(
+                    description=description.description,
+                    start=description.start_time,
+                    end=description.end_time,
+                    type=description.type
+                )
+                for description in descriptions
+            ]
+            await checkpoint.commit(scene_artifacts)
 
-        return visual
+        await self._gather_stage([
+            self._generate_sound_effect(i, scene_artifacts, checkpoint)
+            for i, sound_effect in enumerate(scene_artifacts.sound_effects) if sound_effect.path is None
+        ])
 
-    async def generate_video(self, story_node: StoryNode, style: Style, output_path: str) -> None:
-        temp_dir = tempfile.mkdtemp(dir=os.path.dirname(output_path))
+    async def _ensure_scene_audio(self, scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint) -> None:
+        workspace = checkpoint.workspace
+        scene_audio_path = workspace.path(self._get_scene_dir(scene_artifacts.scene_id), "audio.mp3")
+        await self._mix_scene_audio(
+            [self._to_line_audio(line, workspace) for line in scene_artifacts.lines],
+            [self._to_sound_effect_audio(sound_effect, workspace) for sound_effect in scene_artifacts.sound_effects],
+            scene_audio_path
+        )
+        workspace.track(scene_audio_path)
 
-        script = story_node.script
+        scene_artifacts.audio_path = self._get_relative_path(workspace, scene_audio_path)
+        await checkpoint.commit(scene_artifacts, [scene_artifacts.audio_path])
+
+    async def _generate_scene(self, scene: Scene, language: str, style: Style, subjects: dict[str, Subject], prompts: Awaitable[dict[int, str]], scene_artifacts: SceneArtifacts, checkpoint: NodeCheckpoint, regenerate_image: bool = False) -> None:
+        """Runs the stages of the scene that have not completed yet: image and lines, then sound effects, then the mix."""
+        image, _ = await self._gather_stage([
+            self._ensure_scene_image(scene, style, prompts, scene_artifacts, checkpoint, regenerate_image),
+            self._ensure_scene_lines(scene, language, subjects, scene_artifacts, checkpoint)
+        ])
         try:
-            self.logger.info("Generating scenes clips...")
-            tasks = [
-                self._generate_scenes(scene, script.language, style, story_node.subjects, temp_dir)
-                for scene in script.scenes
-            ]
-            scenes = await asyncio.gather(*tasks)
-            scenes_clips = [visual.clip for visual in scenes]
-
-            self.logger.info("Concatenating scenes clips...")
-            video = concatenate_videoclips(scenes_clips)
-            
-            self.logger.info(f"Writing final video to {output_path}")
-            video.write_videofile(
-                output_path,
-                fps=24,
+            if scene_artifacts.audio_path is None:
+                await self._ensure_scene_sound_effects(image, scene_artifacts, checkpoint)
+                await self._ensure_scene_audio(scene_artifacts, checkpoint)
+        finally:
+            image.release()
+
+    def _open_mix_clip(self, audio: Audio) -> AudioFileClip:
+        if isinstance(audio, SoundEffectAudio):
+            return audio.open_clip().with_effects([
+                MultiplyVolume(0.6),
+                AudioFadeIn(self._get_audio_fade_duration(audio)),
+                AudioFadeOut(self._get_audio_fade_duration(audio))
+            ])
+        return audio.open_clip()
+
+    def _write_audio_mix(self, audios: list[Audio], output_path: str, **write_options) -> None:
+        with RenderResources() as resources:
+            audio_clip = CompositeAudioClip([resources.track(self._open_mix_clip(audio)) for audio in audios])
+            audio_clip.write_audiofile(output_path, fps=44100, logger=None, **write_options)
+
+    async def _mix_audio(self, audios: list[Audio], output_path: str, **write_options) -> None:
+        async with self.reader_limiter.readers(len(audios)):
+            await asyncio.to_thread(self._write_audio_mix, audios, output_path, **write_options)
+
+    async def _mix_scene_audio(self, lines_audio: list[LineAudio], sound_effects_audios: list[SoundEffectAudio], output_path: str) -> None:
+        """Mixes a scene's lines and sound effects into a single file.
+
+        Every source clip is opened only for the duration of the mix and counted
+        against the reader limit, so the final encode holds one reader per scene.
+        A scene with more sources than the limit is first mixed in batches of at
+        most that many into lossless intermediate files.
+        """
+        audios: list[Audio] = [*lines_audio, *sound_effects_audios]
+        batch_size = self.reader_limiter.max_readers
+        intermediate_paths = []
+        try:
+            while len(audios) > batch_size:
+                batches = [audios[i:i + batch_size] for i in range(0, len(audios), batch_size)]
+                audios = []
+                for batch in batches:
+                    batch_path = str(Path(output_path).with_name(f"mix-{len(intermediate_paths)}.wav"))
+                    await self._mix_audio(batch, batch_path)
+                    intermediate_paths.append(batch_path)
+                    audios.append(Audio(batch_path, max(audio.start + audio.duration for audio in batch)))
+            await self._mix_audio(audios, output_path, bitrate="192k")
+        finally:
+            for intermediate_path in intermediate_paths:
+                if os.path.exists(intermediate_path):
+                    os.remove(intermediate_path)
+
+    def _fetch_artifacts(self, workspace: RenderWorkspace, scenes_artifacts: list[SceneArtifacts], paths: list[str]) -> None:
+        blobs = {path: key for scene_artifacts in scenes_artifacts for path, key in scene_artifacts.blobs.items()}
+        for path in paths:
+            if path not in blobs:
+                raise ArtifactNotFoundError(f"No stored artifact for {path}")
+            output_path = workspace.path(path)
+            self.artifact_store.fetch(blobs[path], output_path)
+            workspace.track(output_path)
+
+    def _open_scene_clip(self, resources: RenderResources, workspace: RenderWorkspace, scene_artifacts: SceneArtifacts) -> VideoClip:
+        image_clip = resources.track(self.visual_service.open_image_clip(str(workspace.root / scene_artifacts.image_path)))
+        audio_clip = resources.track(AudioFileClip(str(workspace.root / scene_artifacts.audio_path)))
+        return image_clip.with_duration(audio_clip.duration).with_audio(audio_clip)
+
+    async def _assemble_video(self, workspace: RenderWorkspace, scenes_artifacts: list[SceneArtifacts], artifact_paths: list[str]) -> ComposedVideo:
+        first_image = ImageAsset.from_file(str(workspace.root / scenes_artifacts[0].image_path))
+        try:
+            thumbnail = await asyncio.to_thread(first_image.get_thumbnail)
+        finally:
+            first_image.release()
+        return ComposedVideo(workspace, thumbnail, scenes_artifacts, artifact_paths)
+
+    def _write_video(self, video: ComposedVideo, profile: RenderProfile) -> str:
+        with RenderResources() as resources:
+            clip = concatenate_videoclips([
+                self._open_scene_clip(resources, video.workspace, scene_artifacts)
+                for scene_artifacts in video.scenes_artifacts
+            ])
+            resources.track(clip)
+            if tuple(clip.size) != (profile.width, profile.height):
+                clip = clip.resized(new_size=(profile.width, profile.height))
+
+            encoded_path = video.workspace.path(f"{profile.width}x{profile.height}.{VIDEO_EXTENSION}")
+            clip.write_videofile(
+                encoded_path,
+                fps=profile.fps,
                 codec='libx264',
-                audio_codec='mp3'
+                audio_codec='mp3',
+                preset=profile.preset,
+                bitrate=profile.bitrate,
+                audio_bitrate=profile.audio_bitrate,
+                temp_audiofile_path=str(video.workspace.root),
+                logger=None
             )
-            video.close()
-            for scene_clip in scenes_clips:
-                scene_clip.close()
-                
-            self.logger.info("Video generation completed successfully")
-
-            story_node.thumbnail_url = f"data:image/jpeg;base64,{scenes[0].base64_image}"
-        except (ImageGenerationError, AudioGenerationError) as e:
+        return encoded_path
+
+    async def _encode_video(self, video: ComposedVideo, profile: RenderProfile) -> str:
+        """Encodes the video, holding a reader for each scene's audio while its clips are open."""
+        async with self.reader_limiter.readers(len(video.scenes_artifacts)):
+            return await asyncio.to_thread(self._write_video, video, profile)
+
+    async def compose_video(
+        self,
+        story_node: StoryNode,
+        style: Style,
+        story_id: str,
+        save_checkpoint: Optional[Callable[[], Awaitable[None]]] = None,
+        regenerate_images: bool = False
+    ) -> ComposedVideo:
+        """Generates every scene of the node into a scratch workspace and joins them.
+
+        The outputs of each stage are recorded on the node's scene artifacts as it
+        completes. With save_checkpoint they are also stored right away and the node is
+        saved, and stages already recorded on the node are skipped, so a failed
+        generation resumes from its last completed stages. The workspace lives as long
+        as the returned video and is removed by close_video. Cached prompts and images
+        are bypassed when regenerate_images is set.
+        """
+        workspace = self.workspace_manager.create(str(story_node.id))
+        checkpoint = NodeCheckpoint(self.artifact_store, workspace, story_id, str(story_node.id), save_checkpoint)
+
+        script = story_node.script
+        if not story_node.scenes_artifacts:
+            story_node.scenes_artifacts = [
+                SceneArtifacts(scene_id=scene.id, lines=[None] * len(scene.lines))
+                for scene in script.scenes
+            ]
+        scenes_artifacts = story_node.scenes_artifacts
+        try:
+            async with RssMonitor(f"composition of node {story_node.id}"):
+                fetched_paths = [path for scene_artifacts in scenes_artifacts for path in self._get_required_paths(scene_artifacts)]
+                if fetched_paths:
+                    self.logger.info(f"Resuming node {story_node.id} from {len(fetched_paths)} stored artifacts")
+                    await asyncio.to_thread(self._fetch_artifacts, workspace, scenes_artifacts, fetched_paths)
+
+                self.logger.info("Generating scenes clips...")
+                missing_images = [
+                    scene for scene, scene_artifacts in zip(script.scenes, scenes_artifacts)
+                    if scene_artifacts.image_path is None
+                ]
+                prompts = asyncio.ensure_future(self.visual_service.get_image_generation_prompts(missing_images, style, regenerate_images))
+                await self._gather_stage([
+                    self._generate_scene(scene, script.language, style, story_node.subjects, prompts, scene_artifacts, checkpoint, regenerate_images)
+                    for scene, scene_artifacts in zip(script.scenes, scenes_artifacts)
+                ])
+
+                return await self._assemble_video(workspace, scenes_artifacts, checkpoint.pending_paths)
+        except (ImageGenerationError, AudioGenerationError, WorkspaceQuotaExceededError, ArtifactNotFoundError) as e:
+            workspace.cleanup()
             self.logger.error(f"Failed to generate video: {str(e)}", exc_info=True)
             raise VideoGenerationError(str(e))
         except Exception as e:
+            workspace.cleanup()
             self.logger.error(f"Unexpected error during video generation: {str(e)}", exc_info=True)
             raise VideoGenerationError(f"Unexpected error during video generation: {str(e)}")
+
+    async def prepare_video(self, story_node: StoryNode) -> ComposedVideo:
+        """Rebuilds the video of a generated node from its stored scene images and mixes, to encode it again."""
+        workspace = self.workspace_manager.create(str(story_node.id))
+        try:
+            paths = [path for scene_artifacts in story_node.scenes_artifacts for path in self._get_required_paths(scene_artifacts)]
+            await asyncio.to_thread(self._fetch_artifacts, workspace, story_node.scenes_artifacts, paths)
+            return await self._assemble_video(workspace, story_node.scenes_artifacts, [])
+        except Exception as e:
+            workspace.cleanup()
+            self.logger.error(f"Failed to prepare video of node {story_node.id}: {str(e)}", exc_info=True)
+            raise VideoGenerationError(str(e))
+
+    async def persist_artifacts(self, video: ComposedVideo, story_id: str, node_id: str) -> list[SceneArtifacts]:
+        """Stores the artifacts produced for the video and moves the node's references to them.
+
+        Blobs the node no longer uses keep their other references and are otherwise
+        left for the garbage collector.
+        """
+        stored_keys = await self.artifact_store.store(video.workspace.root, video.artifact_paths, story_id, node_id)
+
+        previous_keys = {key for scene_artifacts in video.scenes_artifacts for key in scene_artifacts.blobs.values()}
+        for scene_artifacts in video.scenes_artifacts:
+            scene_artifacts.blobs = {
+                path: stored_keys.get(path, scene_artifacts.blobs.get(path))
+                for path in self._get_artifact_paths(scene_artifacts)
+                if path in stored_keys or path in scene_artifacts.blobs
+            }
+        keys = {key for scene_artifacts in video.scenes_artifacts for key in scene_artifacts.blobs.values()}
+
+        if previous_keys - keys:
+            await self.artifact_store.remove_references(previous_keys - keys, story_id, node_id)
+        return video.scenes_artifacts
+
+    async def release_story_artifacts(self, story_id: str) -> None:
+        await self.artifact_store.release_story(story_id)
+
+    async def regenerate_scene(
+        self,
+        story_node: StoryNode,
+        style: Style,
+        scene_id: int,
+        target: SceneRegenerationTarget,
+        line_index: Optional[int] = None
+    ) -> ComposedVideo:
+        """Regenerates one part of a scene and re-assembles the node video from its stored artifacts.
+
+        The targeted stage and the scene mix are cleared on a copy of the node's
+        artifacts and the scene's stages run again, so everything else is reused.
+        The new outputs are only stored once persist_artifacts is called.
+        """
+        workspace = self.workspace_manager.create(str(story_node.id))
+        checkpoint = NodeCheckpoint(self.artifact_store, workspace)
+
+        script = story_node.script
+        scenes_artifacts = [scene_artifacts.model_copy(deep=True) for scene_artifacts in story_node.scenes_artifacts]
+        scene_artifacts = next(scene_artifacts for scene_artifacts in scenes_artifacts if scene_artifacts.scene_id == scene_id)
+        scene = next(scene for scene in script.scenes if scene.id == scene_id)
+        try:
+            async with RssMonitor(f"regeneration of scene {scene_id} of node {story_node.id}"):
+                scene_artifacts.audio_path = None
+                if target == SceneRegenerationTarget.IMAGE:
+                    scene_artifacts.image_path = None
+                elif target == SceneRegenerationTarget.LINE:
+                    scene_artifacts.lines[line_index] = None
+                else:
+                    scene_artifacts.sound_effects = None
+
+                fetched_paths = [path for artifacts in scenes_artifacts for path in self._get_required_paths(artifacts)]
+                await asyncio.to_thread(self._fetch_artifacts, workspace, scenes_artifacts, fetched_paths)
+
+                self.logger.info(f"Regenerating {target} of scene {scene_id} of node {story_node.id}")
+                regenerate_image = target == SceneRegenerationTarget.IMAGE
+                prompts = asyncio.ensure_future(self.visual_service.get_image_generation_prompts([scene] if regenerate_image else [], style, regenerate=True))
+                await self._generate_scene(scene, script.language, style, story_node.subjects, prompts, scene_artifacts, checkpoint, regenerate_image)
+
+                return await self._assemble_video(workspace, scenes_artifacts, checkpoint.pending_paths)
+        except (ImageGenerationError, AudioGenerationError, WorkspaceQuotaExceededError, ArtifactNotFoundError) as e:
+            workspace.cleanup()
+            self.logger.error(f"Failed to regenerate scene: {str(e)}", exc_info=True)
+            raise VideoGenerationError(str(e))
+        except Exception as e:
+            workspace.cleanup()
+            self.logger.error(f"Unexpected error during scene regeneration: {str(e)}", exc_info=True)
+            raise VideoGenerationError(f"Unexpected error during scene regeneration: {str(e)}")
+
+    async def render_video(self, video: ComposedVideo, key: str, quality: VideoQuality = VideoQuality.FULL) -> None:
+        """Encodes the composed video into its workspace and uploads it to storage under key.
+
+        Uploads to the same key are serialised, and a video superseded while it was
+        being encoded is not uploaded, so an older render never replaces a newer one.
+        """
+        try:
+            self.logger.info(f"Writing {quality} video to {key}")
+            async with RssMonitor(f"{quality} encode of {key}"):
+                encoded_path = await self._encode_video(video, RENDER_PROFILES[quality])
+            try:
+                async with self.upload_locks.hold(key):
+                    if video.superseded:
+                        self.logger.info(f"Discarding {quality} encode for {key}, the video was superseded")
+                        return
+                    await self.storage.upload(key, encoded_path, f"video/{VIDEO_EXTENSION}")
+            finally:
+                os.remove(encoded_path)
+            self.logger.info(f"{quality.capitalize()} video written to {key}")
+        except Exception as e:
+            self.logger.error(f"Failed to write {quality} video: {str(e)}", exc_info=True)
+            raise VideoGenerationError(f"Failed to write {quality} video: {str(e)}")
+
+    def close_video(self, video: ComposedVideo) -> None:
+        video.workspace.cleanup()
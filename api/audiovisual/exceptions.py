@@ -1,2 +1,5 @@
 class VideoGenerationError(Exception):
-    pass 
\ No newline at end of file
+    pass 
+
+class WorkspaceQuotaExceededError(Exception):
+    pass
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from artifact.artifact_store import ArtifactStore
+from audiovisual.render_workspace import RenderWorkspace
+from story.artifacts import SceneArtifacts
+
+class NodeCheckpoint:
+    """Records the outputs of each completed generation stage of a node.
+
+    With a save callback, outputs are stored in the artifact store as soon as their
+    stage completes and the node is saved, so a failed generation can resume from
+    them. Without one, their paths are only collected, to be stored once the whole
+    generation has succeeded.
+    """
+
+    def __init__(
+        self,
+        artifact_store: ArtifactStore,
+        workspace: RenderWorkspace,
+        story_id: Optional[str] = None,
+        node_id: Optional[str] = None,
+        save: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.artifact_store = artifact_store
+        self.workspace = workspace
+        self.story_id = story_id
+        self.node_id = node_id
+        self.save = save
+        self.pending_paths: list[str] = []
+        self.lock = asyncio.Lock()
+
+    async def commit(self, scene_artifacts: SceneArtifacts, paths: Optional[list[str]] = None) -> None:
+        paths = paths or []
+        if self.save is None:
+            self.pending_paths.extend(paths)
+            return
+
+        keys = await self.artifact_store.store(self.workspace.root, paths, self.story_id, self.node_id)
+        scene_artifacts.blobs.update(keys)
+        async with self.lock:
+            await self.save()
@@ -0,0 +1,29 @@
+from typing import Optional
+from pydantic import BaseModel
+
+from story.story import VideoQuality
+
+class RenderProfile(BaseModel):
+    width: int
+    height: int
+    fps: int
+    preset: str
+    bitrate: Optional[str] = None
+    audio_bitrate: Optional[str] = None
+
+RENDER_PROFILES: dict[VideoQuality, RenderProfile] = {
+    VideoQuality.PREVIEW: RenderProfile(
+        width=640,
+        height=360,
+        fps=12,
+        preset="ultrafast",
+        bitrate="400k",
+        audio_bitrate="64k",
+    ),
+    VideoQuality.FULL: RenderProfile(
+        width=1280,
+        height=720,
+        fps=24,
+        preset="medium",
+    ),
+}
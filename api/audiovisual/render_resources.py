@@ -0,0 +1,105 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, TypeVar
+
+from moviepy.Clip import Clip
+
+ClipType = TypeVar("ClipType", bound=Clip)
+
+class ReaderLimiter:
+    """Caps the number of ffmpeg reader subprocesses open at once across all renders.
+
+    Every audio clip is opened inside a group of readers: the sources of a scene
+    mix while it is written, and one reader per scene while a video is encoded.
+
+    Readers are acquired in one step for a whole group of clips, so a render never
+    holds part of its readers while waiting for the rest. A group larger than the
+    limit could never be satisfied without exceeding it, so it is refused.
+    """
+
+    def __init__(self, max_readers: int):
+        if max_readers < 2:
+            raise ValueError("At least two audio readers are needed to mix audio")
+        self.max_readers = max_readers
+        self.available = max_readers
+        self.condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def readers(self, count: int):
+        if count > self.max_readers:
+            raise ValueError(f"{count} audio readers requested, over the limit of {self.max_readers}")
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.available >= count)
+            self.available -= count
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.available += count
+                self.condition.notify_all()
+
+class RenderResources:
+    """Tracks the clips opened for one render step and closes them on exit."""
+
+    def __init__(self):
+        self.clips: list[Clip] = []
+
+    def track(self, clip: ClipType) -> ClipType:
+        self.clips.append(clip)
+        return clip
+
+    def release(self) -> None:
+        while self.clips:
+            clip = self.clips.pop()
+            try:
+                clip.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "RenderResources":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+class RssMonitor:
+    """Samples the resident set size of the process while a render step runs.
+
+    The size is that of the whole process, so the logged peak includes every render
+    running at the same time, not only this step. Nothing is sampled where
+    /proc/self/statm is unavailable.
+    """
+
+    def __init__(self, name: str, interval: float = 0.25):
+        self.name = name
+        self.interval = interval
+        self.peak_rss = 0
+        self.task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+
+    def _get_rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def _sample(self) -> None:
+        self.peak_rss = max(self.peak_rss, self._get_rss())
+
+    async def _run(self) -> None:
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "RssMonitor":
+        self.task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.task.cancel()
+        self._sample()
+        if self.peak_rss:
+            self.logger.info(f"Peak process RSS during {self.name}: {self.peak_rss / (1024 * 1024):.1f} MiB")
@@ -0,0 +1,97 @@
+import os
+import re
+import shutil
+import logging
+import time
+import tempfile
+from pathlib import Path
+from uuid import uuid4
+
+from audiovisual.exceptions import WorkspaceQuotaExceededError
+
+WORKSPACE_NAME_PATTERN = re.compile(r"^(\d+)-([0-9a-f]{12})-")
+
+class RenderWorkspace:
+    """A scratch directory for the intermediates of a single render."""
+
+    def __init__(self, root: Path, quota_bytes: int):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.used_bytes = 0
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, *parts: str) -> str:
+        path = self.root.joinpath(*parts)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def directory(self, *parts: str) -> str:
+        path = self.root.joinpath(*parts)
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def track(self, path: str) -> None:
+        """Accounts for a file written to the workspace against the quota."""
+        self.used_bytes += os.path.getsize(path)
+        if self.used_bytes > self.quota_bytes:
+            raise WorkspaceQuotaExceededError(
+                f"Render workspace {self.root} used {self.used_bytes} bytes, over its {self.quota_bytes} bytes quota"
+            )
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.logger.info(f"Removed render workspace {self.root} ({self.used_bytes} bytes)")
+
+class WorkspaceManager:
+    """Creates render workspaces on fast local storage and sweeps the ones left behind.
+
+    Workspace directories are prefixed with the owning process id and a token drawn
+    when the manager is created, so a sweep only removes directories whose process
+    is gone. The token tells a restarted server apart from the one that left the
+    directories, as containers usually give it the same pid. Directories of other
+    pids older than max_age are removed too, in case their pid was reused. Entries
+    not named this way were not created by a manager and are left alone, since the
+    root may be a shared directory such as /tmp.
+    """
+
+    def __init__(self, root: str | os.PathLike, quota_bytes: int, max_age: float = 24 * 3600):
+        self.root = Path(root)
+        self.quota_bytes = quota_bytes
+        self.max_age = max_age
+        self.token = uuid4().hex[:12]
+        self.logger = logging.getLogger(__name__)
+
+    def create(self, name: str) -> RenderWorkspace:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}-{self.token}-{name}-", dir=self.root))
+        return RenderWorkspace(path, self.quota_bytes)
+
+    def _is_alive(self, pid: int, token: str, modified_at: float) -> bool:
+        if pid == os.getpid():
+            return token == self.token
+        if time.time() - modified_at > self.max_age:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def sweep_orphans(self) -> int:
+        if not self.root.exists():
+            return 0
+
+        removed = 0
+        for entry in self.root.iterdir():
+            match = WORKSPACE_NAME_PATTERN.match(entry.name)
+            if not match or not entry.is_dir():
+                continue
+            if self._is_alive(int(match.group(1)), match.group(2), entry.stat().st_mtime):
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+
+        self.logger.info(f"Swept {removed} orphaned render workspaces from {self.root}")
+        return removed
@@ -1,32 +1,51 @@
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from google.auth import jwt as google_jwt
 from datetime import datetime, timedelta, timezone
 import jwt
 from typing import Dict, Any
+from cachetools import TTLCache
 from user.user import User
 from user.user_repository import UserRepository
+from auth.google_certs import GoogleCerts
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
 
 class AuthService:
     def __init__(
         self,
         google_client_id: str,
         jwt_secret: str,
+        user_repository: UserRepository,
+        google_certs: GoogleCerts,
         jwt_algorithm: str = "HS256",
-        access_token_expire_minutes: int = 1440
+        access_token_expire_minutes: int = 1440,
+        user_cache_size: int = 1024,
+        user_cache_ttl: float = 300,
+        trust_token_claims: bool = False
     ):
         self.google_client_id = google_client_id
         self.jwt_secret = jwt_secret
         self.jwt_algorithm = jwt_algorithm
         self.access_token_expire_minutes = access_token_expire_minutes
-        self.user_repository = UserRepository()
+        self.user_repository = user_repository
+        self.google_certs = google_certs
+        self.trust_token_claims = trust_token_claims
+        # Users by token subject, so authenticated requests don't each read the user from the database
+        self.user_cache: TTLCache[str, User] = TTLCache(maxsize=user_cache_size, ttl=user_cache_ttl)
+
+    async def _verify_google_id_token(self, id_token_str: str) -> Dict[str, Any]:
+        """Checks the token's signature against the cached Google certificates, its audience and its issuer."""
+        certs = await self.google_certs.get()
+        if jwt.get_unverified_header(id_token_str).get("kid") not in certs:
+            # Google rotates its keys, so the token may be signed with one newer than the cached certificates
+            certs = await self.google_certs.get(refresh=True)
+        idinfo = google_jwt.decode(id_token_str, certs=certs, audience=self.google_client_id)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        return idinfo
 
     async def verify_google_token(self, id_token_str: str) -> str:
         try:
-            idinfo = id_token.verify_oauth2_token(
-                id_token_str, 
-                requests.Request(), 
-                self.google_client_id
-            )
+            idinfo = await self._verify_google_id_token(id_token_str)
             email = idinfo['email']
             user = await self._get_or_create_user(email, idinfo)
             access_token = self._create_access_token(user)
@@ -46,31 +65,51 @@ class AuthService:
             })
         else:
             user = await self.user_repository.update_last_login(email)
+        self.user_cache[user.id] = user
         return user
 
+    def invalidate_user(self, user_id: str) -> None:
+        self.user_cache.pop(user_id, None)
+
     def _create_access_token(self, user: User) -> str:
         expires_delta = timedelta(minutes=self.access_token_expire_minutes)
         expire = datetime.now(timezone.utc) + expires_delta
         to_encode = {
             "sub": str(user.id),
             "email": user.email,
+            "name": user.name,
             "exp": expire
         }
         return jwt.encode(to_encode, self.jwt_secret, algorithm=self.jwt_algorithm)
 
-    async def get_current_user(self, token: str) -> User:
+    def _decode_token(self, token: str) -> Dict[str, Any]:
         try:
             payload = jwt.decode(token, self.jwt_secret, algorithms=[self.jwt_algorithm])
-            user_id = payload.get("sub")
-            if user_id is None:
-                raise Exception("Invalid token")
-            
-            user = await self.user_repository.find_by_id(user_id)
-            if user is None:
-                raise Exception("User not found")
-            
-            return user
         except jwt.ExpiredSignatureError:
             raise Exception("Token has expired")
         except jwt.InvalidTokenError:
-            raise Exception("Invalid token") 
\ No newline at end of file
+            raise Exception("Invalid token")
+        if payload.get("sub") is None:
+            raise Exception("Invalid token")
+        return payload
+
+    async def get_current_user(self, token: str) -> User:
+        user_id = self._decode_token(token)["sub"]
+        user = self.user_cache.get(user_id)
+        if user is None:
+            user = await self.user_repository.find_by_id(user_id)
+            if user is None:
+                raise Exception("User not found")
+            self.user_cache[user_id] = user
+        return user
+
+    async def get_token_user(self, token: str) -> User:
+        """Returns the user named by the token's signed claims, without reading it from the database when trust_token_claims is set.
+
+        Only meant for read-only endpoints, as a user removed since the token was
+        issued keeps access until it expires.
+        """
+        payload = self._decode_token(token)
+        if not self.trust_token_claims or "email" not in payload:
+            return await self.get_current_user(token)
+        return User(id=payload["sub"], email=payload["email"], name=payload.get("name", "")) 
\ No newline at end of file
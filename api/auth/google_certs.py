@@ -0,0 +1,70 @@
+import re
+import time
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+class GoogleCerts:
+    """Google's ID token signing certificates, fetched without blocking the event loop.
+
+    Certificates are kept for as long as the Cache-Control header of the response
+    allows, so verifying a token usually needs no request at all. Concurrent
+    callers share a single refresh.
+    """
+
+    def __init__(self, url: str = GOOGLE_CERTS_URL, default_max_age: float = 300, min_refresh_interval: float = 60, timeout: float = 10):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.certs: dict[str, str] = {}
+        self.fetched_at = float("-inf")
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+        self.client: Optional[httpx.AsyncClient] = None
+        self.logger = logging.getLogger(__name__)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout))
+        return self.client
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+
+    def _get_max_age(self, headers: httpx.Headers) -> float:
+        match = MAX_AGE_PATTERN.search(headers.get("cache-control", ""))
+        if not match:
+            return self.default_max_age
+        age = headers.get("age", "0")
+        return max(int(match.group(1)) - (int(age) if age.isdigit() else 0), 0)
+
+    async def get(self, refresh: bool = False) -> dict[str, str]:
+        """Returns the certificates by key id, fetching them if they expired.
+
+        With refresh set they are fetched even if still valid, unless that was done less
+        than min_refresh_interval ago, so tokens with unknown key ids cannot force a
+        request each.
+        """
+        if time.monotonic() < self.expires_at and (not refresh or time.monotonic() - self.fetched_at < self.min_refresh_interval):
+            return self.certs
+        fetched_before = self.fetched_at
+        async with self.lock:
+            # Another caller may have fetched them while this one waited
+            if self.fetched_at != fetched_before and time.monotonic() < self.expires_at:
+                return self.certs
+            response = await self._get_client().get(self.url)
+            response.raise_for_status()
+            self.certs = response.json()
+            max_age = self._get_max_age(response.headers)
+            self.fetched_at = time.monotonic()
+            self.expires_at = self.fetched_at + max_age
+            self.logger.info(f"Fetched {len(self.certs)} Google certificates, valid for {max_age}s")
+            return self.certs
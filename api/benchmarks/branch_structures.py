@@ -0,0 +1,71 @@
+"""CPU time and memory of preparing the chat and subjects of a new branch against the depth of its parent.
+
+Compares deep copies of the parent's full chat and subjects, as branches used to
+be created, against chaining the chats stored by each node on the path and
+recording new subjects in a ChainMap over the parent's. Both sides then add one
+turn and the subjects of the new node, and read the messages back as they are
+sent to the language model.
+
+Run from the api directory with `python -m benchmarks.branch_structures`.
+"""
+import copy
+import time
+import argparse
+import statistics
+import tracemalloc
+from collections import ChainMap
+
+from benchmarks.fixtures import make_path_story, make_script, make_subjects, add_turn
+from ttt.ttt import Chat
+
+def measure(function, repeat: int) -> tuple[float, float]:
+    """Returns the median time in milliseconds and the peak memory allocated in KiB."""
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 1024
+
+def benchmark(args: argparse.Namespace) -> None:
+    print(f"{'depth':>5} {'messages':>8} {'subjects':>8} {'copied ms':>9} {'copied KiB':>10} {'shared ms':>9} {'shared KiB':>10}")
+    for depth in args.depths:
+        story, full_chats = make_path_story(depth)
+        parent = story.nodes[-1]
+        script = make_script(depth)
+        new_subjects = make_subjects(depth)
+
+        def copied():
+            chat = copy.deepcopy(full_chats[-1])
+            add_turn(chat, depth, script)
+            subjects = copy.deepcopy(parent.subjects)
+            subjects.update(new_subjects)
+            return chat.messages, subjects
+
+        def shared():
+            chat = None
+            for node in story.nodes:
+                chat = Chat(messages=node.chat.messages, parent=chat)
+            chat = chat.extend()
+            add_turn(chat, depth, script)
+            subjects = ChainMap({}, parent.subjects)
+            subjects.update(new_subjects)
+            return chat.get_messages(), dict(subjects)
+
+        copied_messages, copied_subjects = copied()
+        shared_messages, shared_subjects = shared()
+        assert copied_messages == shared_messages and copied_subjects == shared_subjects
+
+        copied_ms, copied_kib = measure(copied, args.repeat)
+        shared_ms, shared_kib = measure(shared, args.repeat)
+        print(f"{depth:>5} {len(copied_messages):>8} {len(copied_subjects):>8} {copied_ms:>9.2f} {copied_kib:>10.1f} {shared_ms:>9.2f} {shared_kib:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--repeat", type=int, default=50)
+    benchmark(parser.parse_args())
@@ -0,0 +1,77 @@
+"""Stories shaped like generated ones, for the benchmarks.
+
+Every node adds a decision prompt and the script written for it to the chat, with
+sizes close to those of real generations.
+"""
+import json
+
+from ttt.ttt import Chat
+from script.script import Script
+from story.story import Story, StoryNode, Character, CharacterGender, Environment
+
+SCENES_PER_SCRIPT = 5
+LINES_PER_SCENE = 4
+SUBJECTS_PER_NODE = 3
+
+def make_script(index: int) -> Script:
+    return Script(
+        title=f"Chapter {index}",
+        genre="drama",
+        language="en",
+        end=False,
+        scenes=[
+            {
+                "id": scene_id,
+                "visual_description": f"Scene {scene_id} of chapter {index}. " + "A rain-soaked street at dusk, neon reflected in the puddles. " * 5,
+                "lines": [
+                    {"type": "dialogue", "character_id": line_id % 3, "line": "I never thought it would end like this, not after everything we went through. " * 2}
+                    for line_id in range(LINES_PER_SCENE)
+                ],
+            }
+            for scene_id in range(SCENES_PER_SCRIPT)
+        ],
+    )
+
+def make_subjects(index: int) -> dict:
+    subjects = {}
+    for subject_id in range(SUBJECTS_PER_NODE):
+        name = f"subject-{index}-{subject_id}"
+        if subject_id % 2:
+            subjects[name] = Environment(name=name, description="An abandoned lighthouse on a cliff above a grey sea. " * 3)
+        else:
+            subjects[name] = Character(name=name, description="A tired detective in a long coat with a scar over one eye. " * 3, age=40, gender=CharacterGender.MALE)
+    return subjects
+
+def add_turn(chat: Chat, index: int, script: Script) -> None:
+    chat.add_user_message(f"Continue the story after decision {index}. " + "Keep the tone, the characters and the setting consistent. " * 8)
+    chat.add_assistant_response(json.dumps(script.model_dump(mode="json")))
+
+def make_path_story(depth: int) -> tuple[Story, list[Chat]]:
+    """Returns a story whose nodes form a single path of the given depth, and the full chat of each node.
+
+    Each node's chat holds only the messages it added, as nodes are stored now.
+    """
+    nodes = []
+    full_chats = []
+    full_chat = Chat()
+    subjects = {}
+    for index in range(depth):
+        script = make_script(index)
+        chat = Chat()
+        add_turn(chat, index, script)
+        full_chat = Chat(messages=[*full_chat.messages, *chat.messages])
+        subjects = {**subjects, **make_subjects(index)}
+        node = StoryNode(
+            script=script,
+            chat=chat,
+            subjects=subjects,
+            decision=f"Decision {index}" if index else None,
+            parent_id=nodes[-1].id if nodes else None,
+        )
+        if nodes:
+            nodes[-1].children.append(node.id)
+        nodes.append(node)
+        full_chats.append(full_chat)
+
+    story = Story(user_id="benchmark", title="Benchmark", genre="drama", style="anime", language="en", root_node_id=nodes[0].id, nodes=nodes)
+    return story, full_chats
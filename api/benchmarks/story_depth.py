@@ -0,0 +1,126 @@
+"""Document size and read latency of a story against the depth of its tree.
+
+Compares the former layout, one story document embedding every node with the full
+chat of its path, against story_nodes documents holding compressed scripts and
+only the chat messages each node added. Sizes are those of the BSON documents.
+Decode times cover turning the fetched documents into models. Read times against
+a mongod are measured too when one is reachable at MONGODB_URL, in a throwaway
+database.
+
+Run from the api directory with `python -m benchmarks.story_depth`.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+from uuid import uuid4
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.binary import UuidRepresentation
+
+from benchmarks.fixtures import make_path_story
+from database.config import MONGODB_URL, DATABASE_NAME
+from database.database import Database
+from story.story import Story
+from story.story_repository import StoryRepository
+
+CODEC_OPTIONS = CodecOptions(uuid_representation=UuidRepresentation.STANDARD)
+MAX_DOCUMENT_SIZE = 16 * 1024 * 1024
+
+def encode(document: dict) -> bytes:
+    return bson.encode(document, codec_options=CODEC_OPTIONS)
+
+def decode(data: bytes) -> dict:
+    return bson.decode(data, codec_options=CODEC_OPTIONS)
+
+def measure(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings) * 1000
+
+async def measure_async(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await function()
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings) * 1000
+
+def get_embedded_document(story: Story, full_chats: list) -> dict:
+    nodes = [node.model_copy(update={"chat": chat}) for node, chat in zip(story.nodes, full_chats)]
+    return story.model_copy(update={"nodes": nodes}).model_dump()
+
+def get_projected(document: dict, excluded: tuple[str, ...]) -> dict:
+    return {field: value for field, value in document.items() if field not in excluded}
+
+async def measure_server(database: Database, story: Story, embedded_document: dict, repeat: int) -> tuple[float, float, float]:
+    repository = StoryRepository(database)
+    await repository.create(story)
+    embedded = database.db.stories_embedded
+    await embedded.insert_one(embedded_document)
+    path_ids = [node.id for node in story.nodes]
+
+    embedded_read = await measure_async(lambda: embedded.find_one({"id": story.id}), repeat)
+    story_read = await measure_async(lambda: repository.find_by_id(story.id, story.user_id), repeat)
+    async def branch_read():
+        await repository.find_by_id(story.id, story.user_id)
+        await repository.find_chats(story.id, path_ids)
+    return embedded_read, story_read, await measure_async(branch_read, repeat)
+
+async def benchmark(args: argparse.Namespace) -> None:
+    database = Database(MONGODB_URL, f"{DATABASE_NAME}_benchmark_{uuid4().hex[:8]}", server_selection_timeout_ms=1000)
+    with_server = await database.ping()
+    if not with_server:
+        print(f"No mongod reachable at {MONGODB_URL}, only measuring sizes and decode times")
+    # Only used to build node documents when no server is reachable
+    repository = StoryRepository(database if with_server else SimpleNamespace(db=SimpleNamespace(stories=None, story_nodes=None)))
+
+    header = f"{'depth':>5} {'embedded KiB':>12} {'story KiB':>9} {'max node KiB':>12} {'nodes KiB':>9} {'embedded decode ms':>18} {'story decode ms':>15} {'branch decode ms':>16}"
+    if with_server:
+        header += f" {'embedded read ms':>16} {'story read ms':>13} {'branch read ms':>14}"
+    print(header)
+    try:
+        for depth in args.depths:
+            story, full_chats = make_path_story(depth)
+            embedded_document = get_embedded_document(story, full_chats)
+            embedded_data = encode(embedded_document)
+            story_data = encode(repository._to_story_document(story))
+            node_documents = [repository._to_node_document(story.id, node) for node in story.nodes]
+            node_data = [encode(document) for document in node_documents]
+            projected_data = [encode(get_projected(document, ("script", "chat"))) for document in node_documents]
+            chat_data = [encode({"id": document["id"], "chat": document["chat"]}) for document in node_documents]
+
+            embedded_decode = measure(lambda: Story(**decode(embedded_data)), args.repeat)
+            def story_decode():
+                return Story(**decode(story_data), nodes=[repository._to_node(decode(data)) for data in projected_data])
+            def branch_decode():
+                story_decode()
+                for data in chat_data:
+                    repository._to_node(decode(data))
+
+            row = (
+                f"{depth:>5} {len(embedded_data) / 1024:>12.1f} {len(story_data) / 1024:>9.1f} "
+                f"{max(map(len, node_data)) / 1024:>12.1f} {sum(map(len, node_data)) / 1024:>9.1f} "
+                f"{embedded_decode:>18.2f} {measure(story_decode, args.repeat):>15.2f} {measure(branch_decode, args.repeat):>16.2f}"
+            )
+            if len(embedded_data) > MAX_DOCUMENT_SIZE:
+                row += " (embedded document over the 16 MB limit)"
+            elif with_server:
+                embedded_read, story_read, branch_read = await measure_server(database, story, embedded_document, args.repeat)
+                row += f" {embedded_read:>16.2f} {story_read:>13.2f} {branch_read:>14.2f}"
+            print(row)
+    finally:
+        if with_server:
+            await database.client.drop_database(database.db.name)
+        database.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(benchmark(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""Load benchmark of concurrent clients seeking through a node video served by FileRangeResponse.
+
+Each client requests a random byte range of the video, like a player seeking, as
+many times as asked. With --mode full, clients instead download from byte 0 up to
+the end of the range they wanted, as they had to when ranges were ignored.
+
+Run from the api directory with `python -m benchmarks.video_seeking`.
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+from video.video_response import FileRangeResponse
+
+def create_app(video_path: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/video")
+    async def get_video(request: Request) -> FileRangeResponse:
+        return FileRangeResponse(video_path, request_headers=request.headers, media_type="video/mp4")
+
+    return app
+
+async def seek(client: httpx.AsyncClient, file_size: int, range_size: int, mode: str) -> tuple[float, int]:
+    start = random.randrange(0, file_size - range_size)
+    end = start + range_size - 1
+    started_at = time.perf_counter()
+    received = 0
+    if mode == "range":
+        response = await client.get("/video", headers={"range": f"bytes={start}-{end}"})
+        assert response.status_code == 206
+        received = len(response.content)
+    else:
+        async with client.stream("GET", "/video") as response:
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > end:
+                    break
+    return time.perf_counter() - started_at, received
+
+async def run_client(base_url: str, file_size: int, range_size: int, seeks: int, mode: str) -> list[tuple[float, int]]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        return [await seek(client, file_size, range_size, mode) for _ in range(seeks)]
+
+async def benchmark(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "video.mp4")
+        with open(video_path, "wb") as video:
+            video.write(os.urandom(args.file_mb * 1024 * 1024))
+        file_size = os.path.getsize(video_path)
+
+        config = uvicorn.Config(create_app(video_path), host="127.0.0.1", port=args.port, log_level="warning")
+        server = uvicorn.Server(config)
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+        try:
+            started_at = time.perf_counter()
+            results = await asyncio.gather(*[
+                run_client(f"http://127.0.0.1:{args.port}", file_size, args.range_kb * 1024, args.seeks, args.mode)
+                for _ in range(args.clients)
+            ])
+            elapsed = time.perf_counter() - started_at
+        finally:
+            server.should_exit = True
+            await server_task
+
+    latencies = sorted(latency for client_results in results for latency, _ in client_results)
+    received = sum(size for client_results in results for _, size in client_results)
+    print(f"mode={args.mode} clients={args.clients} seeks/client={args.seeks} file={args.file_mb} MiB range={args.range_kb} KiB")
+    print(f"{len(latencies) / elapsed:.1f} seeks/s, {received / elapsed / (1024 * 1024):.1f} MiB/s received")
+    print(f"latency p50={statistics.median(latencies) * 1000:.1f} ms p95={latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("range", "full"), default="range")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seeks", type=int, default=20)
+    parser.add_argument("--file-mb", type=int, default=64)
+    parser.add_argument("--range-kb", type=int, default=1024)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(benchmark(parser.parse_args()))
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -10,6 +11,10 @@ BASE_DIR = Path(__file__).parent
 # Output directories
 OUTPUT_DIR = BASE_DIR / "output"
 VIDEOS_DIR = OUTPUT_DIR / "videos"
+PATH_VIDEOS_DIR = VIDEOS_DIR / "paths"
+# Kept on the videos volume, which is the bucket mount in production, so every instance
+# sees them and they survive restarts. Hidden directories are not listed as videos.
+ARTIFACTS_DIR = Path(os.getenv("ARTIFACTS_DIR", VIDEOS_DIR / ".artifacts"))
 
 # API configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -20,14 +25,73 @@ API_BASE_URL = os.getenv("API_BASE_URL", f"http://{API_HOST}:{API_PORT}")
 VIDEO_BASE_URL = f"{API_BASE_URL}/videos"
 VIDEO_EXTENSION = "mp4"
 
+# Render configuration
+TWO_TIER_RENDER = os.getenv("TWO_TIER_RENDER", "true").lower() == "true"
+MAX_CONCURRENT_FULL_RENDERS = int(os.getenv("MAX_CONCURRENT_FULL_RENDERS", "1"))
+# Nodes left at preview when the queue is full can be queued again through the retry endpoint
+MAX_QUEUED_FULL_RENDERS = int(os.getenv("MAX_QUEUED_FULL_RENDERS", "100"))
+# Also bounds the scenes of a node, as its encode keeps one reader open per scene
+MAX_OPEN_AUDIO_READERS = int(os.getenv("MAX_OPEN_AUDIO_READERS", "32"))
+RENDER_SCRATCH_DIR = Path(os.getenv("RENDER_SCRATCH_DIR", Path(tempfile.gettempdir()) / "mirai-renders"))
+RENDER_WORKSPACE_QUOTA_MB = int(os.getenv("RENDER_WORKSPACE_QUOTA_MB", "1024"))
+# A generating node that has not checkpointed for this long is assumed abandoned and can be retried
+NODE_GENERATION_STALE_AFTER = float(os.getenv("NODE_GENERATION_STALE_AFTER", "900"))
+
+# Authentication
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+TRUST_TOKEN_CLAIMS = os.getenv("TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+# Storage configuration
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "https://storage.googleapis.com")
+S3_BUCKET = os.getenv("S3_BUCKET", "mirai-videos")
+S3_REGION = os.getenv("S3_REGION", "auto")
+S3_PART_SIZE_MB = int(os.getenv("S3_PART_SIZE_MB", "8"))
+S3_MAX_CONCURRENT_PARTS = int(os.getenv("S3_MAX_CONCURRENT_PARTS", "4"))
+SIGNED_URL_EXPIRES_IN = int(os.getenv("SIGNED_URL_EXPIRES_IN", "3600"))
+
+# Image generation configuration
+IMAGE_HEDGING = os.getenv("IMAGE_HEDGING", "true").lower() == "true"
+IMAGE_HEDGE_PERCENTILE = float(os.getenv("IMAGE_HEDGE_PERCENTILE", "0.95"))
+IMAGE_HEDGE_INITIAL_DELAY = float(os.getenv("IMAGE_HEDGE_INITIAL_DELAY", "20"))
+
+# Image cache configuration
+IMAGE_CACHE_DIR = Path(os.getenv("IMAGE_CACHE_DIR", VIDEOS_DIR / ".image_cache"))
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024"))
+
+# Artifact garbage collection configuration
+ARTIFACT_GC_INTERVAL = float(os.getenv("ARTIFACT_GC_INTERVAL", "3600"))
+ARTIFACT_GC_GRACE_PERIOD = float(os.getenv("ARTIFACT_GC_GRACE_PERIOD", "3600"))
+# Path videos built from node videos that were re-rendered are never requested again, so the cache is capped
+PATH_VIDEO_CACHE_MAX_MB = int(os.getenv("PATH_VIDEO_CACHE_MAX_MB", "2048"))
+
 # Create necessary directories
 OUTPUT_DIR.mkdir(exist_ok=True)
 VIDEOS_DIR.mkdir(exist_ok=True)
+PATH_VIDEOS_DIR.mkdir(exist_ok=True)
+ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 
-def get_video_path(story_id: str, node_id: str) -> Path:
-    """Get the path to a video file."""
-    return VIDEOS_DIR / f"{story_id}_{node_id}.{VIDEO_EXTENSION}"
+def get_video_key(story_id: str, node_id: str) -> str:
+    """Get the storage key of a video file."""
+    return f"videos/{story_id}_{node_id}.{VIDEO_EXTENSION}"
 
 def get_video_url(story_id: str, node_id: str) -> str:
     """Get the URL for a video."""
-    return f"{VIDEO_BASE_URL}/stories/{story_id}/nodes/{node_id}" 
\ No newline at end of file
+    return f"{VIDEO_BASE_URL}/stories/{story_id}/nodes/{node_id}"
+
+def get_path_video_key(story_id: str, path_key: str) -> str:
+    """Get the storage key of a cached full-path video file."""
+    return f"videos/paths/{story_id}_{path_key}.{VIDEO_EXTENSION}"
+
+def get_path_video_url(story_id: str, node_id: str) -> str:
+    """Get the URL for the video of the path from the root to a node."""
+    return f"{VIDEO_BASE_URL}/stories/{story_id}/paths/{node_id}"
+
+def get_thumbnail_path(story_id: str, node_id: str, version: str) -> Path:
+    """Get the path to a thumbnail file."""
+    return VIDEOS_DIR / f"{story_id}_{node_id}_{version}.webp"
+
+def get_thumbnail_url(story_id: str, node_id: str, version: str) -> str:
+    """Get the URL for a thumbnail."""
+    return f"{API_BASE_URL}/thumbnails/stories/{story_id}/nodes/{node_id}/{version}.webp"
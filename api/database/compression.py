@@ -0,0 +1,15 @@
+import json
+import zlib
+from typing import Any
+
+COMPRESSION_LEVEL = 6
+
+def compress_json(value: Any) -> bytes:
+    """Serializes a JSON-compatible value and compresses it, to be stored as a binary field."""
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+
+def decompress_json(value: Any) -> Any:
+    """Reverses compress_json. Values stored before compression was introduced are returned as they are."""
+    if isinstance(value, bytes):
+        return json.loads(zlib.decompress(value))
+    return value
@@ -0,0 +1,124 @@
+import logging
+import threading
+from collections import defaultdict
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events per server.
+
+    Pool events are published from the driver's threads, so counters are only
+    updated under a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.servers: dict[str, dict[str, float]] = defaultdict(lambda: {
+            "open": 0,
+            "in_use": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "clears": 0,
+            "max_checkout_wait": 0.0,
+        })
+
+    def _update(self, address: tuple[str, int], **changes: float) -> None:
+        with self.lock:
+            stats = self.servers[f"{address[0]}:{address[1]}"]
+            for name, change in changes.items():
+                stats[name] += change
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        self._update(event.address, clears=1)
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._update(event.address, checkout_failures=1)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self.lock:
+            stats = self.servers[f"{event.address[0]}:{event.address[1]}"]
+            stats["in_use"] += 1
+            stats["checkouts"] += 1
+            stats["max_checkout_wait"] = max(stats["max_checkout_wait"], getattr(event, "duration", 0.0))
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self._update(event.address, in_use=-1)
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        with self.lock:
+            return {address: dict(stats) for address, stats in self.servers.items()}
+
+class Database:
+    """Owns the single MongoDB client of the process and its connection pool.
+
+    Repositories get their collections from here instead of opening their own
+    clients, so every query shares one bounded pool that is closed on shutdown.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        name: str,
+        max_pool_size: int = 50,
+        min_pool_size: int = 0,
+        max_idle_time_ms: int = 300000,
+        connect_timeout_ms: int = 5000,
+        server_selection_timeout_ms: int = 5000,
+        socket_timeout_ms: int = 30000,
+        wait_queue_timeout_ms: int = 10000,
+    ):
+        self.max_pool_size = max_pool_size
+        self.pool_stats = PoolStatsListener()
+        self.client = AsyncIOMotorClient(
+            url,
+            uuidRepresentation="standard",
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            maxIdleTimeMS=max_idle_time_ms,
+            connectTimeoutMS=connect_timeout_ms,
+            serverSelectionTimeoutMS=server_selection_timeout_ms,
+            socketTimeoutMS=socket_timeout_ms,
+            waitQueueTimeoutMS=wait_queue_timeout_ms,
+            event_listeners=[self.pool_stats],
+        )
+        self.db: AsyncIOMotorDatabase = self.client[name]
+        self.logger = logging.getLogger(__name__)
+
+    async def ping(self) -> bool:
+        try:
+            await self.db.command("ping")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Database ping failed: {str(e)}")
+            return False
+
+    def get_pool_stats(self) -> dict:
+        return {
+            "max_pool_size": self.max_pool_size,
+            "servers": self.pool_stats.get_stats(),
+        }
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,44 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from database.database import Database
+
+logger = logging.getLogger(__name__)
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "stories": [
+        # find_by_id, update, delete and the per-node updates of StoryRepository
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # find_summaries_by_user, sorted and paginated by (updated_at, id)
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)], name="user_id_updated_at_id"),
+    ],
+    "story_nodes": [
+        # Node reads and writes by story, and root thumbnails for summaries
+        IndexModel([("story_id", ASCENDING), ("id", ASCENDING)], unique=True, name="story_id_id_unique"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "artifacts": [
+        IndexModel([("key", ASCENDING)], unique=True, name="key_unique"),
+        # ArtifactRepository.remove_story_references
+        IndexModel([("references.story_id", ASCENDING)], name="references_story_id"),
+        # ArtifactRepository.find_unreferenced
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+}
+
+async def ensure_indexes(database: Database) -> None:
+    """Creates the indexes backing every repository query, leaving existing ones untouched.
+
+    A collection whose indexes cannot be created, for instance because existing
+    documents violate a unique index, is logged and skipped so the API still starts.
+    """
+    for collection, indexes in INDEXES.items():
+        try:
+            names = await database.db[collection].create_indexes(indexes)
+            logger.info(f"Ensured indexes {', '.join(names)} on {collection}")
+        except Exception as e:
+            logger.error(f"Failed to create indexes on {collection}: {str(e)}")
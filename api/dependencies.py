@@ -1,4 +1,5 @@
 from functools import lru_cache
+from datetime import timedelta
 import os
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
@@ -8,6 +9,7 @@ from tti.openai import OpenAI as OpenAITTI
 from tts.openai import OpenAI as OpenAITTS
 from stt.openai import OpenAI as OpenAISTT
 from tti.together import Together as TogetherTTI
+from tti.hedged import Hedged as HedgedTTI
 from tts.tts import TTS
 from tti.tti import TTI
 from ttt.ttt import TTT
@@ -15,12 +17,60 @@ from stt.stt import STT
 from tts.elevenlabs import ElevenLabs
 from script.script_service import ScriptService
 from visual.visual_service import VisualService
+from visual.image_cache import ImageCache
 from audio.audio_service import AudioService
 from audiovisual.audiovisual_service import AudioVisualService
+from audiovisual.render_workspace import WorkspaceManager
+from artifact.artifact_store import ArtifactStore
+from artifact.artifact_repository import ArtifactRepository
+from artifact.artifact_collector import ArtifactCollector
+from database.database import Database
+from database.config import (
+    MONGODB_URL,
+    DATABASE_NAME,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_MAX_IDLE_TIME_MS,
+    MONGODB_CONNECT_TIMEOUT_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_SOCKET_TIMEOUT_MS,
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+)
+from story.story_repository import StoryRepository
+from user.user_repository import UserRepository
 from story.story_service import StoryService
 from video.video_service import VideoService
+from thumbnail.thumbnail_service import ThumbnailService
+from storage.storage import Storage
+from storage.local import LocalStorage
+from storage.s3 import S3Storage
 from auth.auth_service import AuthService
+from auth.google_certs import GoogleCerts
 from user.user import User
+from config import (
+    RENDER_SCRATCH_DIR,
+    RENDER_WORKSPACE_QUOTA_MB,
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_MB,
+    IMAGE_HEDGING,
+    IMAGE_HEDGE_PERCENTILE,
+    IMAGE_HEDGE_INITIAL_DELAY,
+    ARTIFACTS_DIR,
+    ARTIFACT_GC_INTERVAL,
+    ARTIFACT_GC_GRACE_PERIOD,
+    PATH_VIDEO_CACHE_MAX_MB,
+    OUTPUT_DIR,
+    STORAGE_BACKEND,
+    S3_ENDPOINT_URL,
+    S3_BUCKET,
+    S3_REGION,
+    S3_PART_SIZE_MB,
+    S3_MAX_CONCURRENT_PARTS,
+    SIGNED_URL_EXPIRES_IN,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+    TRUST_TOKEN_CLAIMS,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -48,12 +98,46 @@ def get_google_client_id() -> str:
         raise ValueError("Google Client ID not configured")
     return client_id
 
+def get_s3_access_key_id() -> str:
+    access_key_id = os.getenv("S3_ACCESS_KEY_ID")
+    if not access_key_id:
+        raise ValueError("S3 access key ID not configured")
+    return access_key_id
+
+def get_s3_secret_access_key() -> str:
+    secret_access_key = os.getenv("S3_SECRET_ACCESS_KEY")
+    if not secret_access_key:
+        raise ValueError("S3 secret access key not configured")
+    return secret_access_key
+
 def get_jwt_secret() -> str:
     secret = os.getenv("JWT_SECRET")
     if not secret:
         raise ValueError("JWT Secret not configured")
     return secret
 
+@lru_cache()
+def get_database() -> Database:
+    return Database(
+        MONGODB_URL,
+        DATABASE_NAME,
+        max_pool_size=MONGODB_MAX_POOL_SIZE,
+        min_pool_size=MONGODB_MIN_POOL_SIZE,
+        max_idle_time_ms=MONGODB_MAX_IDLE_TIME_MS,
+        connect_timeout_ms=MONGODB_CONNECT_TIMEOUT_MS,
+        server_selection_timeout_ms=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socket_timeout_ms=MONGODB_SOCKET_TIMEOUT_MS,
+        wait_queue_timeout_ms=MONGODB_WAIT_QUEUE_TIMEOUT_MS
+    )
+
+@lru_cache()
+def get_story_repository() -> StoryRepository:
+    return StoryRepository(get_database())
+
+@lru_cache()
+def get_user_repository() -> UserRepository:
+    return UserRepository(get_database())
+
 @lru_cache()
 def get_openai_ttt(api_key: str = Depends(get_openai_api_key)) -> OpenAITTT:
     return OpenAITTT(api_key=api_key)
@@ -71,8 +155,23 @@ def get_openai_stt(api_key: str = Depends(get_openai_api_key)) -> OpenAISTT:
     return OpenAISTT(api_key=api_key)
 
 @lru_cache()
-def get_together_tti(api_key: str = Depends(get_together_api_key)) -> TogetherTTI:
-    return TogetherTTI(api_key=api_key)
+def get_together_tti() -> TogetherTTI:
+    # Built without dependency arguments, so the lifespan closes the same instance the routes use
+    return TogetherTTI(api_key=get_together_api_key())
+
+@lru_cache()
+def get_tti(
+    together_tti: TogetherTTI = Depends(get_together_tti),
+    openai_tti: OpenAITTI = Depends(get_openai_tti)
+) -> TTI:
+    if not IMAGE_HEDGING:
+        return together_tti
+    return HedgedTTI(
+        primary=together_tti,
+        secondary=openai_tti,
+        percentile=IMAGE_HEDGE_PERCENTILE,
+        initial_delay=IMAGE_HEDGE_INITIAL_DELAY
+    )
 
 @lru_cache()
 def get_elevenlabs_tts(api_key: str = Depends(get_elevenlabs_api_key)) -> ElevenLabs:
@@ -83,8 +182,16 @@ def get_script_service(ttt: TTT = Depends(get_openai_ttt)) -> ScriptService:
     return ScriptService(ttt)
 
 @lru_cache()
-def get_visual_service(tti: TTI = Depends(get_together_tti), ttt: TTT = Depends(get_openai_ttt)) -> VisualService:
-    return VisualService(tti, ttt)
+def get_image_cache() -> ImageCache:
+    return ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB * 1024 * 1024)
+
+@lru_cache()
+def get_visual_service(
+    tti: TTI = Depends(get_tti),
+    ttt: TTT = Depends(get_openai_ttt),
+    image_cache: ImageCache = Depends(get_image_cache)
+) -> VisualService:
+    return VisualService(tti, ttt, image_cache)
 
 @lru_cache()
 def get_audio_service(
@@ -94,36 +201,97 @@ def get_audio_service(
 ) -> AudioService:
     return AudioService(tts, stt, ttt)
 
+@lru_cache()
+def get_workspace_manager() -> WorkspaceManager:
+    return WorkspaceManager(RENDER_SCRATCH_DIR, RENDER_WORKSPACE_QUOTA_MB * 1024 * 1024)
+
+@lru_cache()
+def get_storage() -> Storage:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(
+            endpoint_url=S3_ENDPOINT_URL,
+            bucket=S3_BUCKET,
+            access_key_id=get_s3_access_key_id(),
+            secret_access_key=get_s3_secret_access_key(),
+            region=S3_REGION,
+            part_size=S3_PART_SIZE_MB * 1024 * 1024,
+            max_concurrent_parts=S3_MAX_CONCURRENT_PARTS,
+            url_expires_in=SIGNED_URL_EXPIRES_IN
+        )
+    return LocalStorage(OUTPUT_DIR)
+
+@lru_cache()
+def get_artifact_store() -> ArtifactStore:
+    return ArtifactStore(ARTIFACTS_DIR, ArtifactRepository(get_database()))
+
+@lru_cache()
+def get_artifact_collector() -> ArtifactCollector:
+    return ArtifactCollector(
+        get_artifact_store(),
+        get_storage(),
+        get_story_repository(),
+        interval=ARTIFACT_GC_INTERVAL,
+        grace_period=timedelta(seconds=ARTIFACT_GC_GRACE_PERIOD),
+        path_video_cache_max_bytes=PATH_VIDEO_CACHE_MAX_MB * 1024 * 1024
+    )
+
 @lru_cache()
 def get_audiovisual_service(
     visual_service: VisualService = Depends(get_visual_service),
-    audio_service: AudioService = Depends(get_audio_service)
+    audio_service: AudioService = Depends(get_audio_service),
+    workspace_manager: WorkspaceManager = Depends(get_workspace_manager),
+    artifact_store: ArtifactStore = Depends(get_artifact_store),
+    storage: Storage = Depends(get_storage)
 ) -> AudioVisualService:
-    return AudioVisualService(visual_service, audio_service)
+    return AudioVisualService(visual_service, audio_service, workspace_manager, artifact_store, storage)
+
+@lru_cache()
+def get_thumbnail_service() -> ThumbnailService:
+    return ThumbnailService()
 
 @lru_cache()
 def get_story_service(
     script_service: ScriptService = Depends(get_script_service),
-    audiovisual_service: AudioVisualService = Depends(get_audiovisual_service)
+    audiovisual_service: AudioVisualService = Depends(get_audiovisual_service),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    repository: StoryRepository = Depends(get_story_repository)
 ) -> StoryService:
-    return StoryService(script_service, audiovisual_service)
+    return StoryService(script_service, audiovisual_service, thumbnail_service, repository)
+
+@lru_cache()
+def get_video_service(storage: Storage = Depends(get_storage)) -> VideoService:
+    return VideoService(storage)
 
 @lru_cache()
-def get_video_service() -> VideoService:
-    return VideoService()
+def get_google_certs() -> GoogleCerts:
+    return GoogleCerts()
 
 @lru_cache()
 def get_auth_service(
     google_client_id: str = Depends(get_google_client_id),
-    jwt_secret: str = Depends(get_jwt_secret)
+    jwt_secret: str = Depends(get_jwt_secret),
+    user_repository: UserRepository = Depends(get_user_repository),
+    google_certs: GoogleCerts = Depends(get_google_certs)
 ) -> AuthService:
     return AuthService(
         google_client_id=google_client_id,
-        jwt_secret=jwt_secret
+        jwt_secret=jwt_secret,
+        user_repository=user_repository,
+        google_certs=google_certs,
+        user_cache_size=USER_CACHE_SIZE,
+        user_cache_ttl=USER_CACHE_TTL,
+        trust_token_claims=TRUST_TOKEN_CLAIMS
     )
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     auth_service: AuthService = Depends(get_auth_service)
 ) -> User:
-    return await auth_service.get_current_user(token) 
\ No newline at end of file
+    return await auth_service.get_current_user(token) 
+
+async def get_token_user(
+    token: str = Depends(oauth2_scheme),
+    auth_service: AuthService = Depends(get_auth_service)
+) -> User:
+    """Resolves the user of read-only endpoints, from the token's claims alone when TRUST_TOKEN_CLAIMS is set."""
+    return await auth_service.get_token_user(token)
@@ -1,21 +1,42 @@
 import logging
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from story.story_router import router as story_router
 from video.video_router import router as video_router
 from auth.auth_router import router as auth_router
+from thumbnail.thumbnail_router import router as thumbnail_router
 from config import API_HOST, API_PORT
+from dependencies import get_workspace_manager, get_artifact_collector, get_storage, get_database, get_google_certs, get_together_tti, get_current_user
+from database.indexes import ensure_indexes
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database = get_database()
+    await ensure_indexes(database)
+    get_workspace_manager().sweep_orphans()
+    artifact_collection = asyncio.create_task(get_artifact_collector().run())
+    yield
+    artifact_collection.cancel()
+    await get_storage().close()
+    # Only closed if a request created it, as creating it needs the API key
+    if get_together_tti.cache_info().currsize:
+        await get_together_tti().close()
+    await get_google_certs().close()
+    database.close()
+
 app = FastAPI(
     title="Mirai API",
     description="API for generating and managing interactive stories",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -29,6 +50,7 @@ app.add_middleware(
 app.include_router(story_router)
 app.include_router(video_router)
 app.include_router(auth_router)
+app.include_router(thumbnail_router)
 
 @app.get("/")
 async def root():
@@ -37,4 +59,13 @@ async def root():
         "version": "1.0.0",
         "host": API_HOST,
         "port": API_PORT
-    } 
\ No newline at end of file
+    } 
+
+@app.get("/health")
+async def health():
+    return {"database": await get_database().ping()}
+
+# Only served to signed in users, as it exposes the database servers
+@app.get("/health/pool")
+async def health_pool(current_user = Depends(get_current_user)):
+    return get_database().get_pool_stats()
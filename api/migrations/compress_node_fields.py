@@ -0,0 +1,53 @@
+"""Compresses the scripts and chats of story nodes stored before they were kept as compressed JSON.
+
+Nodes are read either way, so the migration only saves space and transfer, and
+can be run again after an interruption as compressed nodes are skipped.
+
+Run from the api directory with `python -m migrations.compress_node_fields`.
+"""
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from database.config import MONGODB_URL, DATABASE_NAME
+from database.compression import compress_json
+from story.story_repository import COMPRESSED_NODE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+async def migrate() -> int:
+    client = AsyncIOMotorClient(MONGODB_URL, uuidRepresentation="standard")
+    db = client[DATABASE_NAME]
+    migrated = 0
+    try:
+        query = {"$or": [{field: {"$type": "object"}} for field in COMPRESSED_NODE_FIELDS]}
+        cursor = db.story_nodes.find(query, {"_id": 1, **{field: 1 for field in COMPRESSED_NODE_FIELDS}})
+        operations = []
+        async for node in cursor:
+            changes = {
+                field: compress_json(node[field])
+                for field in COMPRESSED_NODE_FIELDS
+                if isinstance(node.get(field), dict)
+            }
+            if "script" in changes:
+                changes["title"] = node["script"]["title"]
+            operations.append(UpdateOne({"_id": node["_id"]}, {"$set": changes}))
+            if len(operations) == BATCH_SIZE:
+                await db.story_nodes.bulk_write(operations, ordered=False)
+                migrated += len(operations)
+                operations = []
+        if operations:
+            await db.story_nodes.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+    finally:
+        client.close()
+    return migrated
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrated = asyncio.run(migrate())
+    logger.info(f"Compressed {migrated} story nodes")
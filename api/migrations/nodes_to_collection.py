@@ -0,0 +1,65 @@
+"""Moves the nodes embedded in story documents into the story_nodes collection.
+
+Each node keeps only the chat messages it appended to its parent's chat. Stories
+are migrated one at a time and only lose their embedded nodes once every node is
+written, so the migration can be run again after an interruption.
+
+Run from the api directory with `python -m migrations.nodes_to_collection`.
+"""
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+
+from database.config import MONGODB_URL, DATABASE_NAME
+
+logger = logging.getLogger(__name__)
+
+def get_chat_delta(node: dict, nodes: dict) -> list:
+    messages = node["chat"]["messages"]
+    parent = nodes.get(node.get("parent_id"))
+    if parent is None:
+        return messages
+
+    parent_messages = parent["chat"]["messages"]
+    if messages[:len(parent_messages)] != parent_messages:
+        logger.warning(f"Chat of node {node['id']} does not extend its parent's chat, keeping only the messages past it")
+    return messages[len(parent_messages):]
+
+async def migrate() -> int:
+    client = AsyncIOMotorClient(MONGODB_URL, uuidRepresentation="standard")
+    db = client[DATABASE_NAME]
+    migrated = 0
+    try:
+        cursor = db.stories.find({"nodes": {"$exists": True}}, {"id": 1, "nodes": 1})
+        async for story in cursor:
+            nodes = {node["id"]: node for node in story["nodes"]}
+            operations = [
+                ReplaceOne(
+                    {"story_id": story["id"], "id": node["id"]},
+                    {
+                        **node,
+                        "story_id": story["id"],
+                        "chat": {**node["chat"], "messages": get_chat_delta(node, nodes)},
+                    },
+                    upsert=True
+                )
+                for node in story["nodes"]
+            ]
+            try:
+                if operations:
+                    await db.story_nodes.bulk_write(operations, ordered=False)
+                await db.stories.update_one({"id": story["id"]}, {"$unset": {"nodes": ""}})
+            except Exception as e:
+                logger.error(f"Failed to migrate nodes of story {story['id']}: {str(e)}")
+                continue
+            migrated += 1
+    finally:
+        client.close()
+    return migrated
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrated = asyncio.run(migrate())
+    logger.info(f"Migrated nodes of {migrated} stories")
@@ -0,0 +1,73 @@
+"""Rewrites node thumbnails stored as base64 data URLs into thumbnail files.
+
+Both the nodes still embedded in story documents and those in the story_nodes
+collection are rewritten, so it can run before or after nodes_to_collection.
+
+Run from the api directory with `python -m migrations.thumbnails_to_files`.
+"""
+import asyncio
+import base64
+import logging
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database.config import MONGODB_URL, DATABASE_NAME
+from thumbnail.thumbnail_service import ThumbnailService
+from visual.image_asset import ImageAsset
+
+DATA_URL_PREFIX = "data:"
+
+logger = logging.getLogger(__name__)
+
+def save_thumbnail(thumbnail_service: ThumbnailService, story_id, node_id, thumbnail_url: str) -> Optional[str]:
+    try:
+        _, _, data = thumbnail_url.partition(",")
+        thumbnail = ImageAsset(base64.b64decode(data)).get_thumbnail()
+        return thumbnail_service.save_thumbnail(str(story_id), str(node_id), thumbnail)
+    except Exception as e:
+        logger.error(f"Failed to migrate thumbnail of node {node_id} in story {story_id}: {str(e)}")
+        return None
+
+async def migrate() -> int:
+    client = AsyncIOMotorClient(MONGODB_URL, uuidRepresentation="standard")
+    db = client[DATABASE_NAME]
+    thumbnail_service = ThumbnailService()
+    migrated = 0
+    try:
+        cursor = db.stories.find(
+            {"nodes.thumbnail_url": {"$regex": f"^{DATA_URL_PREFIX}"}},
+            {"id": 1, "nodes.id": 1, "nodes.thumbnail_url": 1}
+        )
+        async for story in cursor:
+            for node in story["nodes"]:
+                thumbnail_url = node.get("thumbnail_url")
+                if not thumbnail_url or not thumbnail_url.startswith(DATA_URL_PREFIX):
+                    continue
+                url = save_thumbnail(thumbnail_service, story["id"], node["id"], thumbnail_url)
+                if url is None:
+                    continue
+                await db.stories.update_one(
+                    {"id": story["id"], "nodes.id": node["id"]},
+                    {"$set": {"nodes.$.thumbnail_url": url}}
+                )
+                migrated += 1
+
+        cursor = db.story_nodes.find(
+            {"thumbnail_url": {"$regex": f"^{DATA_URL_PREFIX}"}},
+            {"_id": 1, "story_id": 1, "id": 1, "thumbnail_url": 1}
+        )
+        async for node in cursor:
+            url = save_thumbnail(thumbnail_service, node["story_id"], node["id"], node["thumbnail_url"])
+            if url is None:
+                continue
+            await db.story_nodes.update_one({"_id": node["_id"]}, {"$set": {"thumbnail_url": url}})
+            migrated += 1
+    finally:
+        client.close()
+    return migrated
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrated = asyncio.run(migrate())
+    logger.info(f"Migrated {migrated} thumbnails")
@@ -3,7 +3,7 @@ from typing import Optional, Literal, Type
 import re
 import time
 import random
-import copy
+from collections import ChainMap
 
 from ttt.ttt import TTT, ChatOptions
 from script.script import Script, Line, Scene, LineType
@@ -351,7 +351,8 @@ The final output must be a `visual_description` for each scene in the narrative,
         raise Exception(f"Function failed after {self.max_retries} retries.")
 
     async def generate(self, chat: Chat, genre: Genre = None, language_code: str = None, decision: str = None, subjects: dict[str, Subject] = {}) -> tuple[Script, dict[str, Subject]]:
-        subjects = copy.deepcopy(subjects)
+        # New subjects are only ever added, so they are recorded over the given ones instead of copying them
+        subjects = ChainMap({}, subjects)
 
         self.logger.info(f"Generating narrative with genre: {genre}, language: {language_code}, decision: {decision}")
         message = self._get_narrative_generation_message(genre, language_code, decision)
@@ -391,4 +392,4 @@ The final output must be a `visual_description` for each scene in the narrative,
             language=language_code,
             scenes=scenes,
             end=False
-        ), subjects
\ No newline at end of file
+        ), dict(subjects)
\ No newline at end of file
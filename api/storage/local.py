@@ -0,0 +1,85 @@
+import os
+import shutil
+import asyncio
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from storage.storage import StoredObject
+
+class LocalStorage:
+    """Stores objects as files below a root directory, keyed by their relative path."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    def _get_path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Invalid storage key {key}")
+        return path
+
+    def _get_stored_object(self, key: str, stat_result: os.stat_result) -> StoredObject:
+        return StoredObject(
+            key=key,
+            size=stat_result.st_size,
+            etag=f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}",
+            last_modified=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+        )
+
+    def _copy(self, source_path: str, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, partial_path)
+            os.replace(partial_path, path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+    async def upload(self, key: str, source_path: str, content_type: str) -> None:
+        await asyncio.to_thread(self._copy, source_path, self._get_path(key))
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            stat_result = await asyncio.to_thread(self._get_path(key).stat)
+        except FileNotFoundError:
+            return None
+        return self._get_stored_object(key, stat_result)
+
+    def _list(self, prefix: str) -> list[StoredObject]:
+        directory = self._get_path(prefix)
+        if not directory.is_dir():
+            return []
+        objects = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            # Hidden directories hold data other than objects, such as the artifact store
+            dirnames[:] = [dirname for dirname in dirnames if not dirname.startswith(".")]
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                if filename.startswith(".") or not path.is_file():
+                    continue
+                try:
+                    stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append(self._get_stored_object(path.relative_to(self.root.resolve()).as_posix(), stat_result))
+        return objects
+
+    async def list(self, prefix: str) -> list[StoredObject]:
+        return await asyncio.to_thread(self._list, prefix)
+
+    async def delete(self, key: str) -> None:
+        self._get_path(key).unlink(missing_ok=True)
+
+    async def get_download_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        return None
+
+    def get_local_path(self, key: str) -> Optional[Path]:
+        return self._get_path(key)
+
+    async def close(self) -> None:
+        pass
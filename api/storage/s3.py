@@ -0,0 +1,250 @@
+import hmac
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+import httpx
+
+from storage.storage import StoredObject
+from storage.exceptions import StorageError
+
+S3_NAMESPACE = {"s3": "http://s3.amazonaws.com/doc/2006-03-01/"}
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+class S3Storage:
+    """Stores objects in an S3-compatible bucket, signing requests with AWS Signature Version 4.
+
+    Files are uploaded in parts of part_size bytes, at most max_concurrent_parts at a
+    time, so memory use stays bounded whatever the size of the file. Objects are
+    served through presigned URLs instead of being proxied by the API.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str = "us-east-1",
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrent_parts: int = 4,
+        url_expires_in: int = 3600,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.host = httpx.URL(self.endpoint_url).netloc.decode()
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self.max_concurrent_parts = max_concurrent_parts
+        self.url_expires_in = url_expires_in
+        self.client: Optional[httpx.AsyncClient] = None
+        self.logger = logging.getLogger(__name__)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(timeout=httpx.Timeout(60, connect=10))
+        return self.client
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+
+    def _get_canonical_uri(self, key: str) -> str:
+        return quote(f"/{self.bucket}/{key}", safe="/-_.~")
+
+    def _get_canonical_query(self, query: dict[str, str]) -> str:
+        return "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(query.items())
+        )
+
+    def _get_scope(self, date: str) -> str:
+        return f"{date}/{self.region}/s3/aws4_request"
+
+    def _get_signature(self, string_to_sign: str, date: str) -> str:
+        key = f"AWS4{self.secret_access_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def _sign(self, method: str, key: str, query: dict[str, str], headers: dict[str, str], payload_hash: str, timestamp: str) -> str:
+        signed_headers = ";".join(sorted(name.lower() for name in headers))
+        canonical_headers = "".join(f"{name.lower()}:{value.strip()}\n" for name, value in sorted(headers.items(), key=lambda item: item[0].lower()))
+        canonical_request = "\n".join([
+            method,
+            self._get_canonical_uri(key),
+            self._get_canonical_query(query),
+            canonical_headers,
+            signed_headers,
+            payload_hash,
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            timestamp,
+            self._get_scope(timestamp[:8]),
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        return self._get_signature(string_to_sign, timestamp[:8])
+
+    def _get_timestamp(self) -> str:
+        return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    def _get_url(self, key: str, query: dict[str, str]) -> str:
+        url = f"{self.endpoint_url}{self._get_canonical_uri(key)}"
+        if query:
+            url = f"{url}?{self._get_canonical_query(query)}"
+        return url
+
+    async def _request(
+        self,
+        method: str,
+        key: str = "",
+        query: Optional[dict[str, str]] = None,
+        content: bytes = b"",
+        headers: Optional[dict[str, str]] = None,
+    ) -> httpx.Response:
+        query = query or {}
+        headers = headers or {}
+        timestamp = self._get_timestamp()
+        payload_hash = hashlib.sha256(content).hexdigest()
+        signed_headers = {
+            **headers,
+            "host": self.host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": timestamp,
+        }
+        signed_header_names = ";".join(sorted(name.lower() for name in signed_headers))
+        signature = self._sign(method, key, query, signed_headers, payload_hash, timestamp)
+        authorization = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{self._get_scope(timestamp[:8])}, "
+            f"SignedHeaders={signed_header_names}, Signature={signature}"
+        )
+        return await self._get_client().request(
+            method,
+            self._get_url(key, query),
+            content=content,
+            headers={**signed_headers, "Authorization": authorization}
+        )
+
+    def _raise_for_status(self, response: httpx.Response, action: str) -> None:
+        if response.is_error:
+            raise StorageError(f"Failed to {action}: {response.status_code} {response.text[:500]}")
+
+    def _read_part(self, source_path: str, part_number: int) -> bytes:
+        with open(source_path, "rb") as f:
+            f.seek((part_number - 1) * self.part_size)
+            return f.read(self.part_size)
+
+    async def _upload_part(self, key: str, upload_id: str, source_path: str, part_number: int, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            content = await asyncio.to_thread(self._read_part, source_path, part_number)
+            response = await self._request("PUT", key, {"partNumber": str(part_number), "uploadId": upload_id}, content)
+            self._raise_for_status(response, f"upload part {part_number} of {key}")
+            return response.headers["ETag"]
+
+    async def _upload_multipart(self, key: str, source_path: str, size: int, content_type: str) -> None:
+        response = await self._request("POST", key, {"uploads": ""}, headers={"content-type": content_type})
+        self._raise_for_status(response, f"start multipart upload of {key}")
+        upload_id = ElementTree.fromstring(response.content).findtext("s3:UploadId", namespaces=S3_NAMESPACE)
+
+        try:
+            semaphore = asyncio.Semaphore(self.max_concurrent_parts)
+            parts_count = -(-size // self.part_size)
+            etags = await asyncio.gather(*[
+                self._upload_part(key, upload_id, source_path, part_number, semaphore)
+                for part_number in range(1, parts_count + 1)
+            ])
+
+            parts = "".join(
+                f"<Part><PartNumber>{part_number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for part_number, etag in enumerate(etags, start=1)
+            )
+            content = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode()
+            response = await self._request("POST", key, {"uploadId": upload_id}, content, {"content-type": "application/xml"})
+            self._raise_for_status(response, f"complete multipart upload of {key}")
+            if b"<Error>" in response.content:
+                raise StorageError(f"Failed to complete multipart upload of {key}: {response.text[:500]}")
+        except Exception:
+            await self._abort_multipart(key, upload_id)
+            raise
+
+    async def _abort_multipart(self, key: str, upload_id: str) -> None:
+        """Aborts a failed multipart upload. Errors are only logged, so they never hide the upload's own."""
+        try:
+            response = await self._request("DELETE", key, {"uploadId": upload_id})
+            if response.is_error:
+                self.logger.warning(f"Failed to abort multipart upload of {key}: {response.status_code}")
+        except Exception as e:
+            self.logger.warning(f"Failed to abort multipart upload of {key}: {str(e)}")
+
+    async def upload(self, key: str, source_path: str, content_type: str) -> None:
+        size = Path(source_path).stat().st_size
+        if size > self.part_size:
+            await self._upload_multipart(key, source_path, size, content_type)
+        else:
+            content = await asyncio.to_thread(Path(source_path).read_bytes)
+            response = await self._request("PUT", key, content=content, headers={"content-type": content_type})
+            self._raise_for_status(response, f"upload {key}")
+        self.logger.info(f"Uploaded {size} bytes to {key}")
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        self._raise_for_status(response, f"stat {key}")
+        return StoredObject(
+            key=key,
+            size=int(response.headers["Content-Length"]),
+            etag=response.headers["ETag"].strip('"'),
+            last_modified=parsedate_to_datetime(response.headers["Last-Modified"])
+        )
+
+    async def list(self, prefix: str) -> list[StoredObject]:
+        objects = []
+        query = {"list-type": "2", "prefix": prefix}
+        while True:
+            response = await self._request("GET", query=query)
+            self._raise_for_status(response, f"list {prefix}")
+            result = ElementTree.fromstring(response.content)
+            for contents in result.iterfind("s3:Contents", S3_NAMESPACE):
+                objects.append(StoredObject(
+                    key=contents.findtext("s3:Key", namespaces=S3_NAMESPACE),
+                    size=int(contents.findtext("s3:Size", namespaces=S3_NAMESPACE)),
+                    etag=contents.findtext("s3:ETag", namespaces=S3_NAMESPACE).strip('"'),
+                    last_modified=datetime.fromisoformat(contents.findtext("s3:LastModified", namespaces=S3_NAMESPACE).replace("Z", "+00:00"))
+                ))
+            token = result.findtext("s3:NextContinuationToken", namespaces=S3_NAMESPACE)
+            if not token:
+                return objects
+            query = {**query, "continuation-token": token}
+
+    async def delete(self, key: str) -> None:
+        response = await self._request("DELETE", key)
+        if response.status_code != 404:
+            self._raise_for_status(response, f"delete {key}")
+
+    async def get_download_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        timestamp = self._get_timestamp()
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{self._get_scope(timestamp[:8])}",
+            "X-Amz-Date": timestamp,
+            "X-Amz-Expires": str(self.url_expires_in),
+            "X-Amz-SignedHeaders": "host",
+        }
+        if filename:
+            query["response-content-disposition"] = f'inline; filename="{filename}"'
+        query["X-Amz-Signature"] = self._sign("GET", key, query, {"host": self.host}, UNSIGNED_PAYLOAD, timestamp)
+        return self._get_url(key, query)
+
+    def get_local_path(self, key: str) -> Optional[Path]:
+        return None
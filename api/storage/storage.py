@@ -0,0 +1,35 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Protocol
+
+from pydantic import BaseModel
+
+class StoredObject(BaseModel):
+    key: str
+    size: int
+    etag: str
+    last_modified: datetime
+
+class Storage(Protocol):
+    async def upload(self, key: str, source_path: str, content_type: str) -> None:
+        ...
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        ...
+
+    async def list(self, prefix: str) -> list[StoredObject]:
+        ...
+
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def get_download_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        """Returns a URL clients can fetch the object from directly, if the backend has one."""
+        ...
+
+    def get_local_path(self, key: str) -> Optional[Path]:
+        """Returns the path of the object on the local filesystem, if the backend has one."""
+        ...
+
+    async def close(self) -> None:
+        ...
@@ -0,0 +1,36 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from audio.audio import SoundEffectType
+from script.script import LineType
+from stt.stt import TranscriptionWord
+
+class LineArtifact(BaseModel):
+    path: str
+    duration: float
+    start: float
+    transcription: list[TranscriptionWord]
+    type: LineType
+
+class SoundEffectArtifact(BaseModel):
+    description: str
+    start: float
+    end: float
+    type: SoundEffectType
+    path: Optional[str] = None
+    duration: Optional[float] = None
+
+class SceneArtifacts(BaseModel):
+    """Per-scene media of a node, filled in stage by stage as the node is generated.
+
+    Paths give the layout of the scene within a render workspace, and blobs maps
+    each of them to the key of its content in the artifact store. A missing entry
+    marks a stage that has not completed yet.
+    """
+    scene_id: int
+    image_path: Optional[str] = None
+    lines: list[Optional[LineArtifact]] = []
+    sound_effects: Optional[list[SoundEffectArtifact]] = None
+    audio_path: Optional[str] = None
+    blobs: dict[str, str] = {}
@@ -5,4 +5,25 @@ class BranchCreationError(Exception):
     pass
 
 class StoryNotFoundError(Exception):
-    pass 
\ No newline at end of file
+    pass 
+
+class InvalidCursorError(Exception):
+    pass
+
+class InvalidRegenerationRequestError(Exception):
+    pass
+
+class SceneRegenerationError(Exception):
+    pass
+
+class NodeNotRetryableError(Exception):
+    pass
+
+class NodeConflictError(Exception):
+    pass
+
+class NodeGenerationError(Exception):
+    def __init__(self, message: str, story_id: str, node_id: str):
+        super().__init__(message)
+        self.story_id = story_id
+        self.node_id = node_id
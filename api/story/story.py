@@ -7,12 +7,27 @@ from enum import StrEnum
 from script.script import Script
 from common.genre import Genre
 from ttt.ttt import Chat
+from story.artifacts import SceneArtifacts
 
 class Style(StrEnum):
     CARTOON = "cartoon"
     REALISTIC = "realistic"
     ANIME = "anime"
 
+class VideoQuality(StrEnum):
+    PREVIEW = "preview"
+    FULL = "full"
+
+class NodeStatus(StrEnum):
+    GENERATING = "generating"
+    FAILED = "failed"
+    READY = "ready"
+
+class SceneRegenerationTarget(StrEnum):
+    IMAGE = "image"
+    LINE = "line"
+    SOUND_EFFECTS = "sound_effects"
+
 class SubjectType(StrEnum):
     ENVIRONMENT = "environment"
     CHARACTER = "character"
@@ -36,20 +51,30 @@ class Character(Subject):
     voice_id: Optional[str] = None
 
 class PathNode(BaseModel):
-    script: Script
+    id: UUID
+    title: str
     decision: Optional[str] = None
+    video_quality: Optional[VideoQuality] = None
 
 class StoryNode(BaseModel):
     """Represents a node in the story tree."""
     id: UUID = Field(default_factory=uuid4)
     subjects: dict[str, Annotated[Union[Character, Environment], Field(discriminator='type')]] = {}
-    script: Script
+    # None when the node was loaded without it
+    script: Optional[Script] = None
     decision: Optional[str] = None
     parent_id: Optional[UUID] = None
     children: list[UUID] = []
     video_url: Optional[str] = None
+    video_quality: Optional[VideoQuality] = None
     thumbnail_url: Optional[str] = None
-    chat: Chat
+    scenes_artifacts: list[SceneArtifacts] = []
+    status: NodeStatus = NodeStatus.READY
+    error: Optional[str] = None
+    # Only the messages this node appended to its parent's chat, None when the node was loaded without it
+    chat: Optional[Chat] = None
+    # Incremented by every write to the node, each of which only applies to the version it was loaded at
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -64,4 +89,39 @@ class Story(BaseModel):
     root_node_id: UUID
     nodes: list[StoryNode] = []
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class StorySummary(BaseModel):
+    """A story without its nodes, as returned by story listings."""
+    id: UUID
+    title: str
+    genre: Genre
+    style: Style
+    language: str
+    root_node_id: UUID
+    thumbnail_url: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class StoryPage(BaseModel):
+    stories: list[StorySummary]
+    next_cursor: Optional[str] = None
+
+class StoryTreeNode(BaseModel):
+    """The tree-shaped metadata of a node, without its script or chat."""
+    id: UUID
+    parent_id: Optional[UUID] = None
+    children: list[UUID] = []
+    depth: int = 0
+    title: str
+    decision: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    video_url: Optional[str] = None
+    video_quality: Optional[VideoQuality] = None
+    status: NodeStatus = NodeStatus.READY
+
+class StoryTree(BaseModel):
+    id: UUID
+    title: str
+    root_node_id: UUID
+    nodes: list[StoryTreeNode] = []
@@ -1,70 +1,260 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from uuid import UUID
-from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime, timezone
 
-from database.config import MONGODB_URL, DATABASE_NAME
-from story.story import Story
+from database.database import Database
+from database.compression import compress_json, decompress_json
+from story.story import Story, StoryNode, StorySummary, StoryTree, StoryTreeNode, NodeStatus, VideoQuality
+from script.script import Script
+from ttt.ttt import Chat
+
+SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "genre": 1,
+    "style": 1,
+    "language": 1,
+    "root_node_id": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
+# Stored as compressed JSON, as they make up most of a node's size but few reads need them
+COMPRESSED_NODE_FIELDS = ("script", "chat")
+
+TREE_NODE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "parent_id": 1,
+    "children": 1,
+    "title": 1,
+    # Nodes stored before their script was compressed have no title of their own
+    "script.title": 1,
+    "decision": 1,
+    "thumbnail_url": 1,
+    "video_url": 1,
+    "video_quality": 1,
+    "status": 1,
+}
 
 class StoryRepository:
-    def __init__(self):
-        self.client = AsyncIOMotorClient(MONGODB_URL, uuidRepresentation="standard")
-        self.db = self.client[DATABASE_NAME]
-        self.collection = self.db.stories
+    """Stores each story in the stories collection and each of its nodes as a separate document in story_nodes.
+
+    Node documents carry the id of their story, and each node only keeps the chat
+    messages it appended to its parent's chat. Scripts and chats are stored
+    compressed, and are only read when asked for.
+    """
+
+    def __init__(self, database: Database):
+        self.collection = database.db.stories
+        self.nodes = database.db.story_nodes
+
+    def _to_story_document(self, story: Story) -> dict:
+        return story.model_dump(exclude={"nodes"})
+
+    def _to_node_document(self, story_id: UUID, node: StoryNode) -> dict:
+        """Returns the node's document, without its script or chat if they were not loaded."""
+        document = {"story_id": story_id, **node.model_dump(exclude=set(COMPRESSED_NODE_FIELDS))}
+        if node.script is not None:
+            document["title"] = node.script.title
+        for field in COMPRESSED_NODE_FIELDS:
+            value = getattr(node, field)
+            if value is not None:
+                document[field] = compress_json(value.model_dump(mode="json"))
+        return document
+
+    def _to_node(self, node: dict) -> StoryNode:
+        node.pop("story_id", None)
+        node.pop("title", None)
+        for field in COMPRESSED_NODE_FIELDS:
+            if field in node:
+                node[field] = decompress_json(node[field])
+        return StoryNode(**node)
+
+    def _to_tree_node(self, node: dict) -> StoryTreeNode:
+        script = node.pop("script", None)
+        if "title" not in node:
+            node["title"] = script["title"]
+        return StoryTreeNode(**node)
+
+    def _get_node_projection(self, with_scripts: bool) -> dict:
+        return {"_id": 0, "chat": 0} if with_scripts else {"_id": 0, "chat": 0, "script": 0}
+
+    async def find_by_id(self, story_id: UUID, user_id: str, with_scripts: bool = False) -> Optional[Story]:
+        """Returns the story with all its nodes, without their chats, and without their scripts unless with_scripts is set."""
+        story = await self.collection.find_one({"id": story_id, "user_id": user_id}, {"_id": 0, "nodes": 0})
+        if not story:
+            return None
+        cursor = self.nodes.find({"story_id": story_id}, self._get_node_projection(with_scripts)).sort("created_at", 1)
+        nodes = [self._to_node(node) async for node in cursor]
+        return Story(**story, nodes=nodes)
+
+    async def find_node(self, story_id: UUID, user_id: str, node_id: UUID) -> Optional[StoryNode]:
+        """Returns a single node of the story, without its script or chat."""
+        if not await self.collection.find_one({"id": story_id, "user_id": user_id}, {"_id": 0, "id": 1}):
+            return None
+        node = await self.nodes.find_one({"story_id": story_id, "id": node_id}, self._get_node_projection(False))
+        if not node:
+            return None
+        return self._to_node(node)
+
+    async def find_script(self, story_id: UUID, node_id: UUID) -> Optional[Script]:
+        node = await self.nodes.find_one({"story_id": story_id, "id": node_id}, {"_id": 0, "script": 1})
+        if not node:
+            return None
+        return Script(**decompress_json(node["script"]))
+
+    async def find_chats(self, story_id: UUID, node_ids: Iterable[UUID]) -> dict[UUID, Chat]:
+        """Returns the chats of the given nodes, each holding only the messages its node appended."""
+        cursor = self.nodes.find({"story_id": story_id, "id": {"$in": list(node_ids)}}, {"_id": 0, "id": 1, "chat": 1})
+        return {node["id"]: Chat(**decompress_json(node["chat"])) async for node in cursor}
+
+    async def node_exists(self, story_id: UUID, user_id: str, node_id: UUID) -> bool:
+        if not await self.collection.find_one({"id": story_id, "user_id": user_id}, {"_id": 0, "id": 1}):
+            return False
+        return await self.nodes.find_one({"story_id": story_id, "id": node_id}, {"_id": 0, "id": 1}) is not None
+
+    async def find_tree(self, story_id: UUID, user_id: str) -> Optional[StoryTree]:
+        story = await self.collection.find_one({"id": story_id, "user_id": user_id}, {"_id": 0, "id": 1, "title": 1, "root_node_id": 1})
+        if not story:
+            return None
+        cursor = self.nodes.find({"story_id": story_id}, TREE_NODE_PROJECTION).sort("created_at", 1)
+        nodes = [self._to_tree_node(node) async for node in cursor]
+        return StoryTree(**story, nodes=nodes)
 
-    async def find_by_id(self, story_id: UUID, user_id: str) -> Optional[Story]:
-        story = await self.collection.find_one({"id": story_id, "user_id": user_id})
-        return Story(**story) if story else None
+    async def find_summaries_by_user(self, user_id: str, limit: int, after: Optional[tuple[datetime, UUID]] = None) -> List[StorySummary]:
+        """Returns up to limit summaries of the user's stories, most recently updated first, starting after the given (updated_at, id)."""
+        query = {"user_id": user_id}
+        if after:
+            updated_at, story_id = after
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "id": {"$lt": story_id}},
+            ]
+        cursor = self.collection.find(query, SUMMARY_PROJECTION).sort([("updated_at", -1), ("id", -1)]).limit(limit)
+        stories = await cursor.to_list(length=limit)
+        if not stories:
+            return []
 
-    async def find_all_by_user(self, user_id: str) -> List[Story]:
-        cursor = self.collection.find({"user_id": user_id})
-        stories = await cursor.to_list(length=None)
-        return [Story(**story) for story in stories]
+        root_nodes = self.nodes.find(
+            {
+                "story_id": {"$in": [story["id"] for story in stories]},
+                "id": {"$in": [story["root_node_id"] for story in stories]},
+            },
+            {"_id": 0, "id": 1, "thumbnail_url": 1}
+        )
+        thumbnails = {node["id"]: node.get("thumbnail_url") async for node in root_nodes}
+        return [StorySummary(**story, thumbnail_url=thumbnails.get(story["root_node_id"])) for story in stories]
 
     async def create(self, story: Story) -> Story:
-        result = await self.collection.insert_one(story.model_dump())
+        await self.collection.insert_one(self._to_story_document(story))
+        await self.nodes.insert_many([self._to_node_document(story.id, node) for node in story.nodes])
         return story
 
-    async def update(self, story: Story) -> Story:
-        await self.collection.update_one(
-            {"id": story.id, "user_id": story.user_id},
-            {"$set": story.model_dump()}
+    async def add_node(self, story_id: UUID, user_id: str, node: StoryNode) -> bool:
+        """Inserts a new node and appends it to its parent's children.
+
+        Only the new node and its parent's children are written, so the cost does not
+        depend on the size of the tree. Appending with $push is atomic, so concurrent
+        branches never overwrite each other.
+
+        The node is inserted before it is linked to its parent and removed again if
+        linking it fails, so a failed write never leaves a node missing from its
+        parent's children.
+        """
+        if not await self.collection.find_one({"id": story_id, "user_id": user_id}, {"_id": 0, "id": 1}):
+            return False
+
+        await self.nodes.insert_one(self._to_node_document(story_id, node))
+        try:
+            result = await self.nodes.update_one(
+                {"story_id": story_id, "id": node.parent_id},
+                {"$push": {"children": node.id}}
+            )
+        except Exception:
+            await self.nodes.delete_one({"story_id": story_id, "id": node.id})
+            raise
+        if result.matched_count == 0:
+            await self.nodes.delete_one({"story_id": story_id, "id": node.id})
+            return False
+
+        return await self._touch(story_id, user_id, datetime.now(timezone.utc))
+
+    def _get_node_filter(self, story_id: UUID, node_id: UUID, version: int) -> dict:
+        # Nodes stored before versions were introduced have none
+        return {"story_id": story_id, "id": node_id, "version": version or {"$in": [0, None]}}
+
+    async def _touch(self, story_id: UUID, user_id: str, now: datetime) -> bool:
+        result = await self.collection.update_one(
+            {"id": story_id, "user_id": user_id},
+            {"$set": {"updated_at": now}}
         )
-        return story
+        return result.matched_count > 0
+
+    async def update_node(self, story_id: UUID, user_id: str, node: StoryNode) -> bool:
+        """Saves the node's own fields if it is still at the version it was loaded at, and increments its version.
+
+        Its children are left as stored, as they are only ever changed by add_node, and
+        so is its chat, which never changes once the node is created. Returns False if
+        the node was written or deleted since it was loaded.
+        """
+        if not await self._touch(story_id, user_id, datetime.now(timezone.utc)):
+            return False
+        document = self._to_node_document(story_id, node)
+        for field in ("story_id", "children", "chat", "version"):
+            document.pop(field, None)
+        result = await self.nodes.update_one(
+            self._get_node_filter(story_id, node.id, node.version),
+            {"$set": document, "$inc": {"version": 1}}
+        )
+        if result.matched_count == 0:
+            return False
+        node.version += 1
+        return True
+
+    async def update_node_video_quality(self, story_id: UUID, user_id: str, node_id: UUID, version: int, video_quality: VideoQuality) -> bool:
+        """Sets the node's video quality unless it was written since it was loaded at version."""
+        now = datetime.now(timezone.utc)
+        if not await self._touch(story_id, user_id, now):
+            return False
+        result = await self.nodes.update_one(
+            self._get_node_filter(story_id, node_id, version),
+            {"$set": {"video_quality": video_quality, "updated_at": now}, "$inc": {"version": 1}}
+        )
+        return result.matched_count > 0
+
+    async def claim_node_for_retry(self, story_id: UUID, user_id: str, node: StoryNode, stale_before: datetime) -> bool:
+        """Marks the node as generating if it failed, or if its generation stalled before stale_before.
+
+        The claim only succeeds if the node is still at the version it was loaded at,
+        whose version is then incremented along with the stored one.
+        """
+        now = datetime.now(timezone.utc)
+        if not await self._touch(story_id, user_id, now):
+            return False
+        result = await self.nodes.update_one(
+            {
+                **self._get_node_filter(story_id, node.id, node.version),
+                "$or": [
+                    {"status": NodeStatus.FAILED},
+                    {"status": NodeStatus.GENERATING, "updated_at": {"$lt": stale_before}},
+                ],
+            },
+            {"$set": {"status": NodeStatus.GENERATING, "error": None, "updated_at": now}, "$inc": {"version": 1}}
+        )
+        if result.matched_count == 0:
+            return False
+        node.version += 1
+        return True
+
+    async def find_existing_ids(self, story_ids: Iterable[UUID]) -> set[UUID]:
+        cursor = self.collection.find({"id": {"$in": list(story_ids)}}, {"id": 1, "_id": 0})
+        return {story["id"] async for story in cursor}
 
     async def delete(self, story_id: UUID, user_id: str) -> bool:
         result = await self.collection.delete_one({"id": story_id, "user_id": user_id})
-        return result.deleted_count > 0
-
-    async def get_by_id(self, story_id: UUID) -> Optional[Story]:
-        story_dict = await self.collection.find_one({"id": story_id})
-        if not story_dict:
-            return None
-            
-        story_dict["id"] = UUID(story_dict["id"])
-        story_dict["root_node_id"] = UUID(story_dict["root_node_id"])
-        
-        for node in story_dict["nodes"]:
-            node["id"] = UUID(node["id"])
-            if node["parent_id"]:
-                node["parent_id"] = UUID(node["parent_id"])
-            node["children"] = [UUID(child_id) for child_id in node["children"]]
-        
-        return Story(**story_dict)
-
-    async def list_stories(self) -> List[Story]:
-        stories = []
-        cursor = self.collection.find()
-        
-        async for story_dict in cursor:
-            story_dict["id"] = UUID(story_dict["id"])
-            story_dict["root_node_id"] = UUID(story_dict["root_node_id"])
-            
-            for node in story_dict["nodes"]:
-                node["id"] = UUID(node["id"])
-                if node["parent_id"]:
-                    node["parent_id"] = UUID(node["parent_id"])
-                node["children"] = [UUID(child_id) for child_id in node["children"]]
-            
-            stories.append(Story(**story_dict))
-            
-        return stories 
\ No newline at end of file
+        if result.deleted_count == 0:
+            return False
+        await self.nodes.delete_many({"story_id": story_id})
+        return True
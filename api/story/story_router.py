@@ -1,14 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
 from uuid import UUID
 from pydantic import BaseModel
 
 from story.story_service import StoryService
-from story.story import Story
-from story.exceptions import StoryNotFoundError, BranchCreationError
+from story.story import Story, StoryPage, StoryTree, SceneRegenerationTarget
+from story.exceptions import (
+    StoryNotFoundError,
+    InvalidCursorError,
+    StoryGenerationError,
+    BranchCreationError,
+    InvalidRegenerationRequestError,
+    SceneRegenerationError,
+    NodeGenerationError,
+    NodeNotRetryableError,
+    NodeConflictError,
+)
 from story.story import Style
 from common.genre import Genre
-from dependencies import get_story_service, get_current_user
+from dependencies import get_story_service, get_current_user, get_token_user
 from utils.utils import validate_language
 
 router = APIRouter(prefix="/stories", tags=["stories"])
@@ -22,22 +32,41 @@ class CreateBranchRequest(BaseModel):
     parent_node_id: UUID
     decision: str
 
+class RegenerateSceneRequest(BaseModel):
+    target: SceneRegenerationTarget
+    line_index: Optional[int] = None
+
+def _to_response(story: Story) -> dict:
+    # Scene artifacts are internal render state, kept out of responses
+    return story.model_dump(exclude={"nodes": {"__all__": {"scenes_artifacts"}}})
+
+def _node_generation_exception(e: NodeGenerationError) -> HTTPException:
+    return HTTPException(
+        status_code=500,
+        detail={"message": str(e), "story_id": e.story_id, "node_id": e.node_id}
+    )
+
 @router.post("")
 async def create_story(
     request: CreateStoryRequest,
     story_service: StoryService = Depends(get_story_service),
     current_user = Depends(get_current_user)
-) -> Story:
+) -> dict:
     validate_language(request.language_code)
     if not request.language_code:
         raise HTTPException(status_code=400, detail="Invalid language code")
-    story = await story_service.create_story(
-        genre=request.genre,
-        language_code=request.language_code,
-        style=request.style,
-        user_id=current_user.id
-    )
-    return story.model_dump()
+    try:
+        story = await story_service.create_story(
+            genre=request.genre,
+            language_code=request.language_code,
+            style=request.style,
+            user_id=current_user.id
+        )
+        return _to_response(story)
+    except NodeGenerationError as e:
+        raise _node_generation_exception(e)
+    except StoryGenerationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{story_id}/branches")
 async def create_branch(
@@ -45,7 +74,7 @@ async def create_branch(
     request: CreateBranchRequest,
     story_service: StoryService = Depends(get_story_service),
     current_user = Depends(get_current_user)
-) -> Story:
+) -> dict:
     try:
         story = await story_service.create_branch(
             story_id=story_id,
@@ -53,21 +82,66 @@ async def create_branch(
             decision=request.decision,
             user_id=current_user.id
         )
-        return story.model_dump()
+        return _to_response(story)
     except StoryNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except NodeGenerationError as e:
+        raise _node_generation_exception(e)
     except BranchCreationError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/{story_id}/nodes/{node_id}/retry")
+async def retry_node(
+    story_id: UUID,
+    node_id: UUID,
+    story_service: StoryService = Depends(get_story_service),
+    current_user = Depends(get_current_user)
+) -> dict:
+    try:
+        story = await story_service.retry_node(story_id, node_id, current_user.id)
+        return _to_response(story)
+    except StoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (NodeNotRetryableError, NodeConflictError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except NodeGenerationError as e:
+        raise _node_generation_exception(e)
+
+@router.post("/{story_id}/nodes/{node_id}/scenes/{scene_id}/regenerate")
+async def regenerate_scene(
+    story_id: UUID,
+    node_id: UUID,
+    scene_id: int,
+    request: RegenerateSceneRequest,
+    story_service: StoryService = Depends(get_story_service),
+    current_user = Depends(get_current_user)
+) -> dict:
+    try:
+        story = await story_service.regenerate_scene(
+            story_id=story_id,
+            node_id=node_id,
+            scene_id=scene_id,
+            target=request.target,
+            user_id=current_user.id,
+            line_index=request.line_index
+        )
+        return _to_response(story)
+    except StoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidRegenerationRequestError, NodeConflictError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SceneRegenerationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{story_id}")
 async def get_story(
     story_id: UUID,
     story_service: StoryService = Depends(get_story_service),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_token_user)
 ) -> dict:
     try:
-        story = await story_service.get_story(story_id, current_user.id)
-        return story.model_dump()
+        story = await story_service.get_story(story_id, current_user.id, with_scripts=True)
+        return _to_response(story)
     except StoryNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -75,8 +149,8 @@ async def get_story(
 async def get_story_tree(
     story_id: UUID,
     story_service: StoryService = Depends(get_story_service),
-    current_user = Depends(get_current_user)
-) -> dict:
+    current_user = Depends(get_token_user)
+) -> StoryTree:
     try:
         return await story_service.get_story_tree(story_id, current_user.id)
     except StoryNotFoundError as e:
@@ -84,11 +158,15 @@ async def get_story_tree(
 
 @router.get("")
 async def list_stories(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     story_service: StoryService = Depends(get_story_service),
-    current_user = Depends(get_current_user)
-) -> List[Story]:
-    stories = await story_service.list_stories(current_user.id)
-    return [story.model_dump() for story in stories]
+    current_user = Depends(get_token_user)
+) -> StoryPage:
+    try:
+        return await story_service.list_stories(current_user.id, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{story_id}")
 async def delete_story(
@@ -1,31 +1,66 @@
 import logging
-from typing import List
-import copy
+import asyncio
+import base64
+from typing import Awaitable, Callable, List, Optional
 from uuid import UUID
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 
 from script.script_service import ScriptService
 from audiovisual.audiovisual_service import AudioVisualService
-from story.story import Story, StoryNode, Style, PathNode
+from thumbnail.thumbnail_service import ThumbnailService
+from story.story import Story, StoryNode, StoryPage, StoryTree, StoryTreeNode, Style, PathNode, VideoQuality, SceneRegenerationTarget, NodeStatus
 from story.story_repository import StoryRepository
-from story.exceptions import StoryGenerationError, BranchCreationError, StoryNotFoundError
+from story.story_tree_index import StoryTreeIndex
+from story.exceptions import (
+    StoryGenerationError,
+    BranchCreationError,
+    StoryNotFoundError,
+    InvalidCursorError,
+    InvalidRegenerationRequestError,
+    SceneRegenerationError,
+    NodeGenerationError,
+    NodeNotRetryableError,
+    NodeConflictError,
+)
 from common.genre import Genre
-from config import get_video_url, get_video_path
+from config import get_video_url, get_video_key, TWO_TIER_RENDER, MAX_CONCURRENT_FULL_RENDERS, MAX_QUEUED_FULL_RENDERS, NODE_GENERATION_STALE_AFTER
 from ttt.ttt import Chat
+from audiovisual.audiovisual import ComposedVideo
+from utils.keyed_lock import KeyedLock
 
 class StoryService:
-    def __init__(self, script_service: ScriptService, audiovisual_service: AudioVisualService):
+    def __init__(
+        self,
+        script_service: ScriptService,
+        audiovisual_service: AudioVisualService,
+        thumbnail_service: ThumbnailService,
+        repository: StoryRepository,
+        two_tier_render: bool = TWO_TIER_RENDER,
+        max_concurrent_full_renders: int = MAX_CONCURRENT_FULL_RENDERS,
+        max_queued_full_renders: int = MAX_QUEUED_FULL_RENDERS
+    ):
         self.script_service = script_service
         self.audiovisual_service = audiovisual_service
-        self.repository = StoryRepository()
+        self.thumbnail_service = thumbnail_service
+        self.repository = repository
         self.logger = logging.getLogger(__name__)
+        self.two_tier_render = two_tier_render
+        self.max_concurrent_full_renders = max_concurrent_full_renders
+        # Only ids are queued, the video is rebuilt from the node's stored artifacts when its render starts
+        self.full_render_queue: asyncio.Queue[tuple[UUID, str, UUID]] = asyncio.Queue(maxsize=max_queued_full_renders)
+        self.queued_full_renders: set[UUID] = set()
+        self.full_render_workers: list[asyncio.Task] = []
+        self.rendering_videos: dict[UUID, ComposedVideo] = {}
+        # Bumped whenever a node gets a new preview, so full renders started from older artifacts are discarded
+        self.render_generations: dict[UUID, int] = {}
+        self.node_locks = KeyedLock()
 
     async def create_story(self, genre: Genre, language_code: str, style: Style, user_id: str) -> Story:
         try:
             chat = Chat()
             script, subjects = await self.script_service.generate(chat=chat, genre=genre, language_code=language_code)
 
-            root_node = StoryNode(script=script, chat=chat, subjects=subjects)
+            root_node = StoryNode(script=script, chat=chat, subjects=subjects, status=NodeStatus.GENERATING)
             story = Story(
                 title=script.title,
                 genre=genre,
@@ -36,9 +71,12 @@ class StoryService:
                 user_id=user_id
             )
 
-            await self._generate_video_for_node(story, root_node)
-            
-            return await self.repository.create(story)
+            story = await self.repository.create(story)
+            await self._generate_node(story, root_node)
+
+            return story
+        except NodeGenerationError:
+            raise
         except Exception as e:
             self.logger.error(f"Failed to create story: {str(e)}", exc_info=True)
             raise StoryGenerationError(str(e))
@@ -49,11 +87,12 @@ class StoryService:
             if not story:
                 raise StoryNotFoundError(f"Story with ID {story_id} not found")
             
-            parent_node = next((node for node in story.nodes if node.id == parent_node_id), None)
+            index = StoryTreeIndex(story.nodes)
+            parent_node = index.get(parent_node_id)
             if not parent_node:
                 raise ValueError(f"Parent node with ID {parent_node_id} not found")
             
-            chat = copy.deepcopy(parent_node.chat)
+            chat = (await self._get_chat(story.id, index, parent_node.id)).extend()
             script, subjects = await self.script_service.generate(
                 chat=chat,
                 genre=story.genre,
@@ -66,74 +105,323 @@ class StoryService:
                 script=script,
                 decision=decision,
                 parent_id=parent_node_id,
-                chat=chat,
+                chat=Chat(messages=chat.messages),
                 subjects=subjects,
+                status=NodeStatus.GENERATING,
             )
 
-            parent_node.children.append(new_node.id)
+            if not await self.repository.add_node(story.id, story.user_id, new_node):
+                raise StoryNotFoundError(f"Story with ID {story_id} not found")
 
+            parent_node.children.append(new_node.id)
             story.nodes.append(new_node)
             story.updated_at = datetime.now(timezone.utc)
-            
-            await self._generate_video_for_node(story, new_node)
-            
-            return await self.repository.update(story)
-        except StoryNotFoundError:
+
+            await self._generate_node(story, new_node)
+
+            return story
+        except (StoryNotFoundError, NodeGenerationError):
             raise
         except Exception as e:
             self.logger.error(f"Failed to create branch: {str(e)}", exc_info=True)
             raise BranchCreationError(str(e))
 
-    async def get_story(self, story_id: UUID, user_id: str) -> Story:
-        story = await self.repository.find_by_id(story_id, user_id)
+    async def get_story(self, story_id: UUID, user_id: str, with_scripts: bool = False) -> Story:
+        story = await self.repository.find_by_id(story_id, user_id, with_scripts=with_scripts)
         if not story:
             raise StoryNotFoundError(f"Story with ID {story_id} not found")
         return story
 
-    async def list_stories(self, user_id: str) -> List[Story]:
-        return await self.repository.find_all_by_user(user_id)
+    def _get_node(self, story: Story, node_id: UUID) -> StoryNode:
+        node = StoryTreeIndex(story.nodes).get(node_id)
+        if not node:
+            raise StoryNotFoundError(f"Node with ID {node_id} not found in story {story.id}")
+        return node
+
+    async def ensure_node_exists(self, story_id: UUID, node_id: UUID, user_id: str) -> None:
+        if not await self.repository.node_exists(story_id, user_id, node_id):
+            raise StoryNotFoundError(f"Node with ID {node_id} not found in story {story_id}")
+
+    async def get_path_to_node(self, story_id: UUID, node_id: UUID, user_id: str) -> List[PathNode]:
+        tree = await self.repository.find_tree(story_id, user_id)
+        if not tree:
+            raise StoryNotFoundError(f"Story with ID {story_id} not found")
+        index = StoryTreeIndex(tree.nodes)
+        if node_id not in index:
+            raise StoryNotFoundError(f"Node with ID {node_id} not found in story {story_id}")
+        return self._get_path_to_node(index, node_id)
+
+    async def get_story_tree(self, story_id: UUID, user_id: str) -> StoryTree:
+        """Returns the story's nodes without their scripts or chats, depth first from the root."""
+        tree = await self.repository.find_tree(story_id, user_id)
+        if not tree:
+            raise StoryNotFoundError(f"Story with ID {story_id} not found")
+
+        nodes = []
+        for node, depth in StoryTreeIndex(tree.nodes).walk(tree.root_node_id):
+            node.depth = depth
+            nodes.append(node)
+        tree.nodes = nodes
+        return tree
+
+    def _encode_cursor(self, updated_at: datetime, story_id: UUID) -> str:
+        return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{story_id}".encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> tuple[datetime, UUID]:
+        try:
+            updated_at, story_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(updated_at), UUID(story_id)
+        except ValueError:
+            raise InvalidCursorError(f"Invalid cursor {cursor}")
+
+    async def list_stories(self, user_id: str, limit: int, cursor: Optional[str] = None) -> StoryPage:
+        """Lists summaries of the user's stories, most recently updated first, a page at a time."""
+        after = self._decode_cursor(cursor) if cursor else None
+        stories = await self.repository.find_summaries_by_user(user_id, limit + 1, after)
+        if len(stories) <= limit:
+            return StoryPage(stories=stories)
+        stories = stories[:limit]
+        return StoryPage(stories=stories, next_cursor=self._encode_cursor(stories[-1].updated_at, stories[-1].id))
 
     async def delete_story(self, story_id: UUID, user_id: str) -> bool:
         success = await self.repository.delete(story_id, user_id)
         if not success:
             raise StoryNotFoundError(f"Story with ID {story_id} not found")
+        await self.audiovisual_service.release_story_artifacts(str(story_id))
         return True
 
-    async def _generate_video_for_node(self, story: Story, node: StoryNode) -> None:
+    async def retry_node(self, story_id: UUID, node_id: UUID, user_id: str) -> Story:
+        """Resumes the generation of a failed node from its last completed stages.
+
+        A node still marked as generating can be retried once it has not saved a
+        checkpoint for NODE_GENERATION_STALE_AFTER seconds, as its generation was
+        most likely lost with the instance running it. A ready node still at preview
+        quality has its full quality render queued again, as it may have been lost
+        the same way or dropped from a full queue.
+        """
+        story = await self.get_story(story_id, user_id)
+        node = self._get_node(story, node_id)
+
+        if self.two_tier_render and node.status == NodeStatus.READY and node.video_quality == VideoQuality.PREVIEW:
+            if node_id not in self.rendering_videos:
+                self._schedule_full_render(story_id, user_id, node_id)
+            return story
+
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=NODE_GENERATION_STALE_AFTER)
+        if not await self.repository.claim_node_for_retry(story_id, user_id, node, stale_before):
+            raise NodeNotRetryableError(f"Node {node_id} is {node.status} and cannot be retried")
+
+        self.logger.info(f"Retrying generation of node {node_id}")
+        node.script = await self.repository.find_script(story_id, node_id)
+        node.status = NodeStatus.GENERATING
+        node.error = None
+        await self._generate_node(story, node)
+        return story
+
+    async def _generate_node(self, story: Story, node: StoryNode) -> None:
+        """Generates the video of an already persisted node, saving the node after every completed stage.
+
+        On failure the node is marked as failed along with the error, keeping the
+        stages it completed for a retry. If the node was written by another request
+        since it was loaded, generation stops and the node is left as that request saved it.
+        """
+        async def save_checkpoint() -> None:
+            node.updated_at = datetime.now(timezone.utc)
+            if not await self.repository.update_node(story.id, story.user_id, node):
+                raise NodeConflictError(f"Node {node.id} was changed while it was being generated")
+
         try:
-            video_path = get_video_path(str(story.id), str(node.id))
+            await self._generate_video_for_node(story, node, save_checkpoint)
+        except NodeConflictError:
+            raise
+        except Exception as e:
+            node.status = NodeStatus.FAILED
+            node.error = str(e)
+            try:
+                await save_checkpoint()
+            except Exception as save_error:
+                self.logger.error(f"Failed to mark node {node.id} as failed: {str(save_error)}", exc_info=True)
+            raise NodeGenerationError(str(e), str(story.id), str(node.id))
+
+        node.status = NodeStatus.READY
+        node.error = None
+        await save_checkpoint()
+        story.updated_at = node.updated_at
+        self._schedule_full_render(story.id, story.user_id, node.id)
 
-            self.logger.info(f"Generating video for node {node.id} at path {video_path}")
-            await self.audiovisual_service.generate_video(
+    async def _generate_video_for_node(self, story: Story, node: StoryNode, save_checkpoint: Callable[[], Awaitable[None]]) -> None:
+        """Renders the node video, only as a preview in two-tier mode."""
+        try:
+            self.logger.info(f"Generating video for node {node.id}")
+            video = await self.audiovisual_service.compose_video(
                 story_node=node,
                 style=story.style,
-                output_path=str(video_path)
+                story_id=str(story.id),
+                save_checkpoint=save_checkpoint
             )
-            
-            node.video_url = get_video_url(str(story.id), str(node.id))
-            story.updated_at = datetime.now(timezone.utc)
-            
-            self.logger.info(f"Successfully generated video for node {node.id}")
+            await self._render_node_video(story, node, video)
+            self.logger.info(f"Successfully generated {node.video_quality} video for node {node.id}")
         except Exception as e:
             self.logger.error(f"Error generating video for node {node.id}: {str(e)}", exc_info=True)
             raise e
 
-    def _get_path_to_node(self, story: Story, node_id: UUID) -> List[PathNode]:
-        path = []
-        current_id = node_id
-        
-        while current_id:
-            node = next((n for n in story.nodes if n.id == current_id), None)
-            if not node:
-                break
-
-            path_node = PathNode(
-                script=node.script,
+    async def _render_node_video(self, story: Story, node: StoryNode, video: ComposedVideo) -> None:
+        """Renders a composed video for the node, stores its scene artifacts and closes it."""
+        video_key = get_video_key(str(story.id), str(node.id))
+        quality = VideoQuality.PREVIEW if self.two_tier_render else VideoQuality.FULL
+        try:
+            await self.audiovisual_service.render_video(video, video_key, quality)
+            node.scenes_artifacts = await self.audiovisual_service.persist_artifacts(video, str(story.id), str(node.id))
+        finally:
+            self.audiovisual_service.close_video(video)
+
+        node.video_quality = quality
+        node.thumbnail_url = self.thumbnail_service.save_thumbnail(str(story.id), str(node.id), video.thumbnail)
+        node.video_url = get_video_url(str(story.id), str(node.id))
+        node.updated_at = datetime.now(timezone.utc)
+        story.updated_at = datetime.now(timezone.utc)
+
+    def _validate_scene_regeneration(self, node: StoryNode, scene_id: int, target: SceneRegenerationTarget, line_index: Optional[int]) -> None:
+        if node.status != NodeStatus.READY:
+            raise InvalidRegenerationRequestError(f"Node {node.id} is {node.status}")
+        if not node.scenes_artifacts:
+            raise InvalidRegenerationRequestError(f"Node {node.id} has no stored scene artifacts to regenerate from")
+        scene = next((scene for scene in node.script.scenes if scene.id == scene_id), None)
+        if not scene or not any(artifacts.scene_id == scene_id for artifacts in node.scenes_artifacts):
+            raise InvalidRegenerationRequestError(f"Scene {scene_id} not found in node {node.id}")
+        if target == SceneRegenerationTarget.LINE and (line_index is None or not 0 <= line_index < len(scene.lines)):
+            raise InvalidRegenerationRequestError(f"Invalid line index {line_index} for scene {scene_id}")
+
+    async def regenerate_scene(
+        self,
+        story_id: UUID,
+        node_id: UUID,
+        scene_id: int,
+        target: SceneRegenerationTarget,
+        user_id: str,
+        line_index: Optional[int] = None
+    ) -> Story:
+        """Regenerates a scene's image, one of its lines or its sound effects and re-renders the node video."""
+        try:
+            async with self.node_locks.hold(node_id):
+                story = await self.get_story(story_id, user_id)
+                node = self._get_node(story, node_id)
+                node.script = await self.repository.find_script(story_id, node_id)
+                self._validate_scene_regeneration(node, scene_id, target, line_index)
+
+                video = await self.audiovisual_service.regenerate_scene(
+                    story_node=node,
+                    style=story.style,
+                    scene_id=scene_id,
+                    target=target,
+                    line_index=line_index
+                )
+                self._supersede_full_render(node.id)
+                await self._render_node_video(story, node, video)
+                if not await self.repository.update_node(story.id, story.user_id, node):
+                    raise NodeConflictError(f"Node {node.id} was changed while its scene was being regenerated")
+                self._schedule_full_render(story.id, story.user_id, node.id)
+
+                return story
+        except (StoryNotFoundError, InvalidRegenerationRequestError, NodeConflictError):
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to regenerate scene {scene_id} of node {node_id}: {str(e)}", exc_info=True)
+            raise SceneRegenerationError(str(e))
+
+    def _schedule_full_render(self, story_id: UUID, user_id: str, node_id: UUID) -> None:
+        """Queues the full quality render of a node whose preview was just saved.
+
+        A render of the node already running is superseded, and a node already queued
+        is not queued twice, as its render reads the node once it starts. When the
+        queue is full the node stays at preview until it is retried.
+        """
+        if not self.two_tier_render:
+            return
+        self._supersede_full_render(node_id)
+        if node_id in self.queued_full_renders:
+            return
+        try:
+            self.full_render_queue.put_nowait((story_id, user_id, node_id))
+        except asyncio.QueueFull:
+            self.logger.warning(f"Full render queue is full, node {node_id} stays at preview quality")
+            return
+        self.queued_full_renders.add(node_id)
+        self._start_full_render_workers()
+
+    def _start_full_render_workers(self) -> None:
+        self.full_render_workers = [worker for worker in self.full_render_workers if not worker.done()]
+        while len(self.full_render_workers) < self.max_concurrent_full_renders:
+            self.full_render_workers.append(asyncio.create_task(self._run_full_render_worker()))
+
+    async def _run_full_render_worker(self) -> None:
+        while True:
+            story_id, user_id, node_id = await self.full_render_queue.get()
+            self.queued_full_renders.discard(node_id)
+            try:
+                await self._render_full_quality(story_id, user_id, node_id)
+            finally:
+                self.full_render_queue.task_done()
+
+    def _supersede_full_render(self, node_id: UUID) -> None:
+        """Stops a running full quality render of the node from replacing a newer video."""
+        if not self.two_tier_render:
+            return
+        self.render_generations[node_id] = self.render_generations.get(node_id, 0) + 1
+        video = self.rendering_videos.pop(node_id, None)
+        if video is not None:
+            video.superseded = True
+
+    async def _render_full_quality(self, story_id: UUID, user_id: str, node_id: UUID) -> None:
+        generation = self.render_generations.get(node_id, 0)
+        video = None
+        try:
+            node = await self.repository.find_node(story_id, user_id, node_id)
+            if not node or node.status != NodeStatus.READY or node.video_quality != VideoQuality.PREVIEW:
+                return
+
+            video = await self.audiovisual_service.prepare_video(node)
+            # The node may have been regenerated while it was read
+            if self.render_generations.get(node_id, 0) != generation:
+                return
+            self.rendering_videos[node_id] = video
+
+            video_key = get_video_key(str(story_id), str(node_id))
+            self.logger.info(f"Rendering full quality video for node {node_id}")
+            await self.audiovisual_service.render_video(video, video_key, VideoQuality.FULL)
+            if video.superseded:
+                return
+            await self.repository.update_node_video_quality(story_id, user_id, node_id, node.version, VideoQuality.FULL)
+            self.logger.info(f"Full quality video available for node {node_id}")
+        except Exception as e:
+            self.logger.error(f"Error rendering full quality video for node {node_id}: {str(e)}", exc_info=True)
+        finally:
+            if video is not None:
+                if self.rendering_videos.get(node_id) is video:
+                    del self.rendering_videos[node_id]
+                self.audiovisual_service.close_video(video)
+            if self.render_generations.get(node_id) == generation and node_id not in self.queued_full_renders:
+                self.render_generations.pop(node_id, None)
+
+    async def _get_chat(self, story_id: UUID, index: StoryTreeIndex[StoryNode], node_id: UUID) -> Chat:
+        """Rebuilds the full chat of a node by chaining the messages appended by each node on its path, without copying the messages.
+
+        Only the chats of the nodes on the path are loaded.
+        """
+        path = index.get_path(node_id)
+        chats = await self.repository.find_chats(story_id, [node.id for node in path])
+        chat = None
+        for node in path:
+            chat = Chat(messages=chats[node.id].messages if node.id in chats else [], parent=chat)
+        return chat or Chat()
+
+    def _get_path_to_node(self, index: StoryTreeIndex[StoryTreeNode], node_id: UUID) -> List[PathNode]:
+        return [
+            PathNode(
+                id=node.id,
+                title=node.title,
+                decision=node.decision,
+                video_quality=node.video_quality,
             )
-            if node.decision:
-                path_node.decision = node.decision
-            path.insert(0, path_node)
-                
-            current_id = node.parent_id
-            
-        return path 
\ No newline at end of file
+            for node in index.get_path(node_id)
+        ] 
\ No newline at end of file
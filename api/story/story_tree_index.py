@@ -0,0 +1,55 @@
+from typing import Generic, Iterable, Iterator, Optional, Protocol, TypeVar
+from uuid import UUID
+
+class TreeNode(Protocol):
+    id: UUID
+    parent_id: Optional[UUID]
+    children: list[UUID]
+
+N = TypeVar("N", bound=TreeNode)
+
+class StoryTreeIndex(Generic[N]):
+    """Id, parent and children maps over the nodes of a loaded story.
+
+    Built once per loaded story, so node lookups are constant time and paths cost
+    their depth instead of a scan of every node per step.
+    """
+
+    def __init__(self, nodes: Iterable[N]):
+        self.nodes: dict[UUID, N] = {node.id: node for node in nodes}
+        self.parents: dict[UUID, Optional[UUID]] = {node.id: node.parent_id for node in self.nodes.values()}
+        self.children: dict[UUID, list[UUID]] = {
+            node.id: [child_id for child_id in node.children if child_id in self.nodes]
+            for node in self.nodes.values()
+        }
+
+    def __contains__(self, node_id: UUID) -> bool:
+        return node_id in self.nodes
+
+    def get(self, node_id: UUID) -> Optional[N]:
+        return self.nodes.get(node_id)
+
+    def get_path(self, node_id: UUID) -> list[N]:
+        """Returns the nodes from the root down to node_id."""
+        path = []
+        current_id = node_id
+        while current_id in self.nodes and len(path) < len(self.nodes):
+            path.append(self.nodes[current_id])
+            current_id = self.parents[current_id]
+        path.reverse()
+        return path
+
+    def walk(self, root_id: UUID) -> Iterator[tuple[N, int]]:
+        """Yields every node below root_id depth first, along with its depth.
+
+        Each node is yielded once, so corrupted children forming a cycle cannot loop forever.
+        """
+        stack = [(root_id, 0)] if root_id in self.nodes else []
+        visited = set()
+        while stack:
+            node_id, depth = stack.pop()
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+            yield self.nodes[node_id], depth
+            stack.extend((child_id, depth + 1) for child_id in reversed(self.children[node_id]))
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from auth.auth_service import AuthService
+from auth.google_certs import GoogleCerts
+
+CLIENT_ID = "client-id.apps.googleusercontent.com"
+
+class SigningKey:
+    def __init__(self, kid: str):
+        self.kid = kid
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+        now = datetime.now(timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(self.private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=1))
+            .sign(self.private_key, hashes.SHA256())
+        )
+        self.certificate = certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+    def sign(self, issuer: str = "https://accounts.google.com") -> str:
+        now = int(time.time())
+        claims = {"iss": issuer, "aud": CLIENT_ID, "sub": "1", "email": "user@example.com", "iat": now, "exp": now + 600}
+        return jwt.encode(claims, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+
+class StandInCertServer:
+    """Serves certificates like Google's certs endpoint, counting the requests it gets."""
+
+    def __init__(self, keys: list[SigningKey]):
+        self.keys = keys
+        self.requests = 0
+
+    async def certs(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        # Slow enough for concurrent callers to overlap
+        await asyncio.sleep(0.05)
+        return web.json_response(
+            {key.kid: key.certificate for key in self.keys},
+            headers={"Cache-Control": "public, max-age=3600"}
+        )
+
+@pytest.fixture(scope="module")
+def keys() -> list[SigningKey]:
+    return [SigningKey("key-1"), SigningKey("key-2")]
+
+@pytest_asyncio.fixture
+async def server(keys):
+    stand_in = StandInCertServer(keys[:1])
+    app = web.Application()
+    app.router.add_get("/certs", stand_in.certs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    stand_in.url = f"http://127.0.0.1:{runner.addresses[0][1]}/certs"
+    yield stand_in
+    await runner.cleanup()
+
+def get_auth_service(google_certs: GoogleCerts) -> AuthService:
+    return AuthService(google_client_id=CLIENT_ID, jwt_secret="secret", user_repository=None, google_certs=google_certs)
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch(server):
+    google_certs = GoogleCerts(server.url)
+    try:
+        results = await asyncio.gather(*[google_certs.get() for _ in range(10)])
+        await google_certs.get()
+    finally:
+        await google_certs.close()
+
+    assert server.requests == 1
+    assert all(certs == {"key-1": server.keys[0].certificate} for certs in results)
+
+@pytest.mark.asyncio
+async def test_unknown_kid_triggers_refresh(server, keys):
+    google_certs = GoogleCerts(server.url, min_refresh_interval=0)
+    auth_service = get_auth_service(google_certs)
+    try:
+        assert (await auth_service._verify_google_id_token(keys[0].sign()))["sub"] == "1"
+        server.keys = keys
+        assert (await auth_service._verify_google_id_token(keys[1].sign()))["sub"] == "1"
+    finally:
+        await google_certs.close()
+
+    assert server.requests == 2
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refreshes_at_most_once_per_interval(server, keys):
+    google_certs = GoogleCerts(server.url, min_refresh_interval=60)
+    auth_service = get_auth_service(google_certs)
+    try:
+        await google_certs.get()
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await auth_service._verify_google_id_token(keys[1].sign())
+    finally:
+        await google_certs.close()
+
+    assert server.requests == 1
+
+@pytest.mark.asyncio
+async def test_wrong_issuer_is_rejected(server, keys):
+    google_certs = GoogleCerts(server.url)
+    auth_service = get_auth_service(google_certs)
+    try:
+        with pytest.raises(ValueError, match="Wrong issuer"):
+            await auth_service._verify_google_id_token(keys[0].sign(issuer="https://issuer.example.com"))
+    finally:
+        await google_certs.close()
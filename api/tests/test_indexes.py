@@ -0,0 +1,89 @@
+"""Checks with explain() that every repository query is served by an index.
+
+Runs against the mongod at MONGODB_URL, for instance the mongodb service of
+docker-compose.yml, in a throwaway database. Skipped when it is unreachable.
+"""
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from database.config import MONGODB_URL, DATABASE_NAME
+from database.database import Database
+from database.indexes import ensure_indexes
+
+STORY_ID = uuid4()
+NODE_ID = uuid4()
+NOW = datetime.now(timezone.utc)
+
+# The filter and sort of each query, named after the repository method issuing it
+QUERIES = {
+    "StoryRepository.find_by_id": ("stories", {"id": STORY_ID, "user_id": "user"}, None),
+    "StoryRepository.find_by_id nodes": ("story_nodes", {"story_id": STORY_ID}, {"created_at": 1}),
+    "StoryRepository.find_node": ("story_nodes", {"story_id": STORY_ID, "id": NODE_ID}, None),
+    "StoryRepository.find_chats": ("story_nodes", {"story_id": STORY_ID, "id": {"$in": [NODE_ID]}}, None),
+    "StoryRepository.find_summaries_by_user": ("stories", {"user_id": "user"}, {"updated_at": -1, "id": -1}),
+    "StoryRepository.find_summaries_by_user after cursor": (
+        "stories",
+        {"user_id": "user", "$or": [{"updated_at": {"$lt": NOW}}, {"updated_at": NOW, "id": {"$lt": STORY_ID}}]},
+        {"updated_at": -1, "id": -1},
+    ),
+    "StoryRepository.find_summaries_by_user root nodes": (
+        "story_nodes", {"story_id": {"$in": [STORY_ID]}, "id": {"$in": [NODE_ID]}}, None
+    ),
+    "StoryRepository.claim_node_for_retry": (
+        "story_nodes",
+        {"story_id": STORY_ID, "id": NODE_ID, "version": 1, "$or": [{"status": "failed"}, {"status": "generating", "updated_at": {"$lt": NOW}}]},
+        None,
+    ),
+    "StoryRepository.delete nodes": ("story_nodes", {"story_id": STORY_ID}, None),
+    "StoryRepository.find_existing_ids": ("stories", {"id": {"$in": [STORY_ID]}}, None),
+    "UserRepository.find_by_email": ("users", {"email": "user@example.com"}, None),
+    "UserRepository.find_by_id": ("users", {"id": "user"}, None),
+    "ArtifactRepository.add_references": ("artifacts", {"key": "key"}, None),
+    "ArtifactRepository.remove_references": ("artifacts", {"key": {"$in": ["key"]}}, None),
+    "ArtifactRepository.remove_story_references": ("artifacts", {"references.story_id": str(STORY_ID)}, None),
+    "ArtifactRepository.find_unreferenced": ("artifacts", {"references": {"$size": 0}, "updated_at": {"$lt": NOW}}, None),
+}
+
+def get_stages(plan: dict) -> list[str]:
+    stages = [plan["stage"]] if "stage" in plan else []
+    for value in plan.values():
+        children = value if isinstance(value, list) else [value]
+        for child in children:
+            if isinstance(child, dict):
+                stages.extend(get_stages(child))
+    return stages
+
+@pytest.fixture(scope="module")
+def mongod() -> None:
+    client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No mongod reachable at {MONGODB_URL}")
+    finally:
+        client.close()
+
+@pytest_asyncio.fixture
+async def database(mongod):
+    database = Database(MONGODB_URL, f"{DATABASE_NAME}_index_test_{uuid4().hex[:8]}")
+    await ensure_indexes(database)
+    yield database
+    await database.client.drop_database(database.db.name)
+    database.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", QUERIES)
+async def test_query_uses_index(database, method):
+    collection, query, sort = QUERIES[method]
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = sort
+    explain = await database.db.command("explain", command, verbosity="queryPlanner")
+
+    stages = get_stages(explain["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages, f"{method} scans {collection}: {stages}"
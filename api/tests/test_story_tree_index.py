@@ -0,0 +1,33 @@
+from typing import Optional
+from uuid import UUID, uuid4
+from dataclasses import dataclass, field
+
+from story.story_tree_index import StoryTreeIndex
+
+@dataclass
+class Node:
+    parent_id: Optional[UUID] = None
+    id: UUID = field(default_factory=uuid4)
+    children: list[UUID] = field(default_factory=list)
+
+def test_walk_yields_nodes_depth_first_with_depths():
+    root = Node()
+    first = Node(parent_id=root.id)
+    second = Node(parent_id=root.id)
+    grandchild = Node(parent_id=first.id)
+    root.children = [first.id, second.id]
+    first.children = [grandchild.id]
+
+    walked = [(node.id, depth) for node, depth in StoryTreeIndex([root, first, second, grandchild]).walk(root.id)]
+
+    assert walked == [(root.id, 0), (first.id, 1), (grandchild.id, 2), (second.id, 1)]
+
+def test_walk_stops_on_cycles():
+    root = Node()
+    child = Node(parent_id=root.id)
+    root.children = [child.id, child.id]
+    child.children = [root.id, child.id]
+
+    walked = [node.id for node, _ in StoryTreeIndex([root, child]).walk(root.id)]
+
+    assert walked == [root.id, child.id]
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from tti.together import Together
+
+IMAGE_DELAY = 0.5
+
+class StandInServer:
+    """Serves the Together image endpoint locally, holding each request for IMAGE_DELAY seconds."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak_active = 0
+        self.connections = set()
+
+    async def generate(self, request: web.Request) -> web.Response:
+        self.connections.add(request.transport)
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await asyncio.sleep(IMAGE_DELAY)
+        finally:
+            self.active -= 1
+        return web.json_response({
+            "id": "image",
+            "model": "model",
+            "object": "list",
+            "data": [{"index": 0, "b64_json": "aW1hZ2U="}],
+        })
+
+@pytest_asyncio.fixture
+async def server():
+    stand_in = StandInServer()
+    app = web.Application()
+    app.router.add_post("/v1/images/generations", stand_in.generate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    stand_in.base_url = f"http://127.0.0.1:{port}/v1/"
+    yield stand_in
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_images_generate_concurrently(server):
+    tti = Together(api_key="test", base_url=server.base_url, max_connections=8)
+    try:
+        start = time.monotonic()
+        images = await asyncio.gather(*[tti.to_image(f"prompt {i}") for i in range(8)])
+        elapsed = time.monotonic() - start
+    finally:
+        await tti.close()
+
+    assert images == ["aW1hZ2U="] * 8
+    assert server.peak_active == 8
+    assert elapsed < 2 * IMAGE_DELAY
+
+@pytest.mark.asyncio
+async def test_session_is_reused_across_requests(server):
+    tti = Together(api_key="test", base_url=server.base_url, max_connections=2)
+    try:
+        for i in range(4):
+            await tti.to_image(f"prompt {i}")
+    finally:
+        await tti.close()
+
+    assert len(server.connections) == 1
@@ -0,0 +1,2 @@
+class ThumbnailNotFoundError(Exception):
+    pass
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from uuid import UUID
+
+from thumbnail.thumbnail_service import ThumbnailService
+from thumbnail.exceptions import ThumbnailNotFoundError
+from dependencies import get_thumbnail_service
+
+router = APIRouter(prefix="/thumbnails", tags=["thumbnails"])
+
+@router.get("/stories/{story_id}/nodes/{node_id}/{version}.webp")
+async def get_thumbnail(
+    story_id: UUID,
+    node_id: UUID,
+    version: str,
+    request: Request,
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service)
+) -> Response:
+    if not version.isalnum():
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    try:
+        return thumbnail_service.get_thumbnail(str(story_id), str(node_id), version, request.headers)
+    except ThumbnailNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,48 @@
+import os
+import hashlib
+import logging
+import tempfile
+from typing import Mapping, Optional
+
+from config import VIDEOS_DIR, get_thumbnail_path, get_thumbnail_url
+from thumbnail.exceptions import ThumbnailNotFoundError
+from video.video_response import FileRangeResponse
+
+class ThumbnailService:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _get_version(self, data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()[:16]
+
+    def save_thumbnail(self, story_id: str, node_id: str, data: bytes) -> str:
+        """Stores the thumbnail under a content-versioned name and returns its URL.
+
+        Older versions of the node thumbnail are removed, since their URLs are no
+        longer referenced once the node is updated.
+        """
+        version = self._get_version(data)
+        thumbnail_path = get_thumbnail_path(story_id, node_id, version)
+        fd, partial_path = tempfile.mkstemp(prefix=f".{thumbnail_path.name}.", dir=thumbnail_path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(partial_path, thumbnail_path)
+
+        for previous_path in VIDEOS_DIR.glob(f"{story_id}_{node_id}_*.webp"):
+            if previous_path != thumbnail_path:
+                previous_path.unlink(missing_ok=True)
+
+        self.logger.info(f"Saved thumbnail for node {node_id} to {thumbnail_path}")
+        return get_thumbnail_url(story_id, node_id, version)
+
+    def get_thumbnail(self, story_id: str, node_id: str, version: str, request_headers: Optional[Mapping[str, str]] = None) -> FileRangeResponse:
+        thumbnail_path = get_thumbnail_path(story_id, node_id, version)
+        if not thumbnail_path.exists():
+            raise ThumbnailNotFoundError(f"Thumbnail not found for story {story_id}, node {node_id}")
+
+        return FileRangeResponse(
+            thumbnail_path,
+            request_headers=request_headers,
+            media_type="image/webp",
+            headers={"Cache-Control": "public, max-age=31536000, immutable"},
+        )
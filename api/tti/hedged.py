@@ -0,0 +1,122 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+from tti.tti import TTI, ImageGenerationOptions
+
+class LatencyTracker:
+    def __init__(self, window: int = 100):
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = min(int(percentile * len(latencies)), len(latencies) - 1)
+        return latencies[index]
+
+class Hedged:
+    """Sends image requests to a primary TTI and hedges slow ones with a secondary TTI.
+
+    The backup request is fired once the primary has been outstanding for longer than
+    the configured percentile of its recent latencies, or straight away if the primary
+    fails. The first successful image wins and the other request is cancelled.
+    """
+
+    def __init__(
+        self,
+        primary: TTI,
+        secondary: TTI,
+        percentile: float = 0.95,
+        initial_delay: float = 20,
+        min_delay: float = 5,
+        max_delay: float = 60,
+        min_samples: int = 10,
+        window: int = 100,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency_trackers = {
+            id(primary): LatencyTracker(window),
+            id(secondary): LatencyTracker(window),
+        }
+        self.logger = logging.getLogger(__name__)
+
+    def get_hedge_delay(self) -> float:
+        tracker = self.latency_trackers[id(self.primary)]
+        if len(tracker.latencies) < self.min_samples:
+            return self.initial_delay
+        return min(max(tracker.percentile(self.percentile), self.min_delay), self.max_delay)
+
+    def get_latency_stats(self) -> dict:
+        return {
+            name: {
+                "provider": type(tti).__module__,
+                "samples": len(self.latency_trackers[id(tti)].latencies),
+                "p50": self.latency_trackers[id(tti)].percentile(0.5),
+                f"p{int(self.percentile * 100)}": self.latency_trackers[id(tti)].percentile(self.percentile),
+            }
+            for name, tti in (("primary", self.primary), ("secondary", self.secondary))
+        }
+
+    @property
+    def providers(self) -> list[TTI]:
+        return [self.primary, self.secondary]
+
+    async def _timed_to_image(self, tti: TTI, prompt: str, options: ImageGenerationOptions) -> tuple[bytes, TTI]:
+        """Requests an image, recording how long it took, and returns it with the TTI that generated it.
+
+        A request cancelled because the other one won is recorded with the time it had
+        been outstanding. Its latency was at least that, and leaving it out would only
+        keep the fast requests and pull the hedge delay down.
+        """
+        start = time.monotonic()
+        try:
+            image = await tti.to_image(prompt, options)
+        except asyncio.CancelledError:
+            self.latency_trackers[id(tti)].record(time.monotonic() - start)
+            raise
+        self.latency_trackers[id(tti)].record(time.monotonic() - start)
+        return image, tti
+
+    async def to_image(self, prompt: str, options: ImageGenerationOptions = ImageGenerationOptions()) -> bytes:
+        image, _ = await self.to_image_with_provider(prompt, options)
+        return image
+
+    async def to_image_with_provider(self, prompt: str, options: ImageGenerationOptions = ImageGenerationOptions()) -> tuple[bytes, TTI]:
+        """Generates an image like to_image, also returning whichever of the two TTIs generated it."""
+        primary = asyncio.ensure_future(self._timed_to_image(self.primary, prompt, options))
+        pending = {primary}
+        hedge_delay = self.get_hedge_delay()
+        errors = []
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if primary in done:
+                if not primary.exception():
+                    return primary.result()
+                errors.append(primary.exception())
+                self.logger.warning(f"Primary TTI failed, falling back to secondary: {primary.exception()}")
+            else:
+                self.logger.info(f"Primary TTI exceeded hedge delay of {hedge_delay:.1f}s, sending backup request")
+
+            pending.add(asyncio.ensure_future(self._timed_to_image(self.secondary, prompt, options)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception():
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
@@ -7,16 +7,29 @@ class OpenAIModel(Enum):
     DALL_E_3 = "dall-e-3"
     DALL_E_2 = "dall-e-2"
 
+SUPPORTED_SIZES = {
+    OpenAIModel.DALL_E_3: [(1024, 1024), (1792, 1024), (1024, 1792)],
+    OpenAIModel.DALL_E_2: [(256, 256), (512, 512), (1024, 1024)],
+}
+
 class OpenAI:
     def __init__(self, api_key: str = None, model: OpenAIModel = OpenAIModel.DALL_E_3, base_url: str = None):
         self.model = model
         self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
 
+    def _get_size(self, options: ImageGenerationOptions) -> str:
+        aspect_ratio = options.width / options.height
+        width, height = min(
+            SUPPORTED_SIZES[self.model],
+            key=lambda size: (abs(size[0] / size[1] - aspect_ratio), abs(size[0] - options.width))
+        )
+        return f'{width}x{height}'
+
     async def to_image(self, prompt: str, options: ImageGenerationOptions = ImageGenerationOptions()) -> bytes:
         response = await self.client.images.generate(
             model=self.model.value,
             prompt=prompt,
-            size=f'{options.width}x{options.height}',
+            size=self._get_size(options),
             n=1,
             response_format='b64_json',
         )
@@ -1,5 +1,10 @@
-from together import Together as TogetherClient
+import asyncio
 from enum import Enum
+from typing import Optional
+
+import aiohttp
+import together
+from together import AsyncTogether as TogetherClient
 
 from tti.tti import ImageGenerationOptions
 
@@ -8,12 +13,40 @@ class TogetherModel(Enum):
     FLUX_1_DEV = "black-forest-labs/FLUX.1-dev"
 
 class Together:
-    def __init__(self, api_key: str = None, model: TogetherModel = TogetherModel.FLUX_1_DEV, base_url: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        model: TogetherModel = TogetherModel.FLUX_1_DEV,
+        base_url: str = None,
+        max_connections: int = 16,
+        keepalive_timeout: float = 60,
+    ):
         self.model = model
         self.client = TogetherClient(api_key=api_key, base_url=base_url)
-    
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Returns the keep-alive session shared by every request made on the running loop."""
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.session_loop = loop
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
     async def to_image(self, prompt: str, options: ImageGenerationOptions = ImageGenerationOptions()) -> bytes:
-        response = self.client.images.generate(
+        # The SDK's async requestor reuses the session found in this context variable
+        # instead of opening and tearing down a new one per request.
+        together.aiosession.set(self._get_session())
+        response = await self.client.images.generate(
             model=self.model.value,
             prompt=prompt,
             width=options.width,
@@ -23,4 +56,4 @@ class Together:
             stop=[],
             response_format='b64_json',
         )
-        return response.data[0].b64_json
\ No newline at end of file
+        return response.data[0].b64_json
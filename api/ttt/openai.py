@@ -18,7 +18,7 @@ class OpenAI(TTT):
                 "role": message.role.value,
                 "content": message.content,
             }
-            for message in chat.messages
+            for message in chat.get_messages()
         ]
     
     async def chat(self, chat: Chat, options: ChatOptions = None):
@@ -1,4 +1,5 @@
-from typing import Protocol, Type, Any
+from typing import Protocol, Type, Any, Optional
+from pydantic import Field
 from enum import StrEnum
 from common.base_model_no_extra import BaseModelNoExtra
 
@@ -14,7 +15,25 @@ class ChatMessage(BaseModelNoExtra):
     content: Any
 
 class Chat(BaseModelNoExtra):
+    """A conversation, optionally continuing a parent chat.
+
+    A chat extending a parent only holds the messages added since, sharing the
+    parent's instead of copying them, so the parent must not change afterwards.
+    """
     messages: list[ChatMessage] = []
+    parent: Optional["Chat"] = Field(default=None, exclude=True)
+
+    def extend(self) -> "Chat":
+        return Chat(parent=self)
+
+    def get_messages(self) -> list[ChatMessage]:
+        """Returns the messages of the parent chats followed by this chat's own."""
+        chats = []
+        chat = self
+        while chat is not None:
+            chats.append(chat)
+            chat = chat.parent
+        return [message for chat in reversed(chats) for message in chat.messages]
 
     def add_user_message(self, message):
         self.messages.append(ChatMessage(role=ChatMessageRole.USER, content=message))
@@ -24,6 +43,7 @@ class Chat(BaseModelNoExtra):
 
     def reset(self):
         self.messages = []
+        self.parent = None
 
 class TTT(Protocol):
     async def chat(self, chat: Chat, options: ChatOptions):
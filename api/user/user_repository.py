@@ -1,15 +1,12 @@
 from datetime import datetime
 from typing import Optional, Dict, Any
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from database.config import MONGODB_URL, DATABASE_NAME
+from database.database import Database
 from user.user import User
 
 class UserRepository:
-    def __init__(self):
-        self.client = AsyncIOMotorClient(MONGODB_URL)
-        self.db = self.client[DATABASE_NAME]
-        self.collection = self.db.users
+    def __init__(self, database: Database):
+        self.collection = database.db.users
 
     async def find_by_email(self, email: str) -> Optional[User]:
         user = await self.collection.find_one({"email": email})
@@ -0,0 +1,27 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+class KeyedLock:
+    """An asyncio lock per key, dropped once no task holds it or waits for it.
+
+    Tasks are counted from before they wait, so a lock released to a waiter that has
+    not resumed yet is still in use and a new task queues behind it.
+    """
+
+    def __init__(self):
+        self.locks: dict[Hashable, asyncio.Lock] = {}
+        self.users: dict[Hashable, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        self.users[key] = self.users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self.users[key] -= 1
+            if self.users[key] == 0:
+                del self.users[key]
+                del self.locks[key]
@@ -1,2 +1,10 @@
 class VideoNotFoundError(Exception):
-    pass 
\ No newline at end of file
+    pass
+
+class RangeNotSatisfiableError(Exception):
+    def __init__(self, message: str, file_size: int):
+        super().__init__(message)
+        self.file_size = file_size
+
+class PathVideoUnavailableError(Exception):
+    pass
@@ -0,0 +1,170 @@
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from video.exceptions import RangeNotSatisfiableError
+
+CHUNK_SIZE = 256 * 1024
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+def get_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def get_last_modified(stat_result: os.stat_result) -> str:
+    return formatdate(stat_result.st_mtime, usegmt=True)
+
+def parse_range_header(range_header: str, file_size: int) -> tuple[int, int]:
+    """Parses a single `bytes=` range into an inclusive (start, end) pair."""
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not ranges.strip():
+        raise RangeNotSatisfiableError(f"Unsupported range: {range_header}", file_size)
+    if "," in ranges:
+        raise RangeNotSatisfiableError("Multiple ranges are not supported", file_size)
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    try:
+        if not sep:
+            raise ValueError
+        if not start_str:
+            suffix_length = int(end_str)
+            if suffix_length <= 0:
+                raise ValueError
+            start, end = max(file_size - suffix_length, 0), file_size - 1
+        else:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+    except ValueError:
+        raise RangeNotSatisfiableError(f"Invalid range: {range_header}", file_size)
+
+    end = min(end, file_size - 1)
+    if start < 0 or start > end:
+        raise RangeNotSatisfiableError(f"Range not satisfiable: {range_header}", file_size)
+    return start, end
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return etag in candidates
+
+def _not_modified_since(header: str, stat_result: os.stat_result) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(stat_result.st_mtime) <= since
+
+def is_not_modified(request_headers: Mapping[str, str], stat_result: os.stat_result) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, get_etag(stat_result))
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        return _not_modified_since(if_modified_since, stat_result)
+    return False
+
+def is_range_applicable(request_headers: Mapping[str, str], stat_result: os.stat_result) -> bool:
+    if_range = request_headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.strip().startswith(("\"", "W/")):
+        return if_range.strip() == get_etag(stat_result)
+    return _not_modified_since(if_range, stat_result)
+
+class FileRangeResponse(Response):
+    """Serves a local file, or a byte range of it, with conditional request support.
+
+    Bodies are sent through the ASGI zero-copy extension when the server offers it,
+    otherwise the file is read in large chunks off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        request_headers: Optional[Mapping[str, str]] = None,
+        media_type: str = "application/octet-stream",
+        filename: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+        stat_result: Optional[os.stat_result] = None,
+    ):
+        request_headers = request_headers or {}
+        self.path = path
+        self.media_type = media_type
+        self.background = background
+        self.body = b""
+        self.stat_result = stat_result or os.stat(path)
+        if not stat.S_ISREG(self.stat_result.st_mode):
+            raise FileNotFoundError(f"{path} is not a file")
+
+        file_size = self.stat_result.st_size
+        self.offset, self.count = 0, file_size
+        self.status_code = 200
+
+        if is_not_modified(request_headers, self.stat_result):
+            self.status_code = 304
+            self.count = 0
+        else:
+            range_header = request_headers.get("range")
+            if range_header and is_range_applicable(request_headers, self.stat_result):
+                start, end = parse_range_header(range_header, file_size)
+                self.offset, self.count = start, end - start + 1
+                self.status_code = 206
+
+        self.init_headers(headers)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["etag"] = get_etag(self.stat_result)
+        self.headers["last-modified"] = get_last_modified(self.stat_result)
+        if filename:
+            self.headers["content-disposition"] = f'inline; filename="{filename}"'
+        if self.status_code == 304:
+            del self.headers["content-length"]
+            del self.headers["content-type"]
+        else:
+            self.headers["content-length"] = str(self.count)
+        if self.status_code == 206:
+            self.headers["content-range"] = f"bytes {self.offset}-{self.offset + self.count - 1}/{file_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.count == 0 or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": ZERO_COPY_EXTENSION,
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.offset)
+                remaining = self.count
+                while remaining > 0:
+                    chunk = await file.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from uuid import UUID
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
 
 from video.video_service import VideoService
-from video.exceptions import VideoNotFoundError
-from dependencies import get_video_service, get_current_user
+from video.exceptions import VideoNotFoundError, RangeNotSatisfiableError, PathVideoUnavailableError
+from dependencies import get_video_service, get_token_user
 from story.story_service import StoryService
 from story.exceptions import StoryNotFoundError
 from dependencies import get_story_service
@@ -15,23 +15,42 @@ router = APIRouter(prefix="/videos", tags=["videos"])
 async def stream_story_video(
     story_id: UUID,
     node_id: UUID,
+    request: Request,
     video_service: VideoService = Depends(get_video_service),
     story_service: StoryService = Depends(get_story_service),
-    current_user = Depends(get_current_user)
-) -> StreamingResponse:
+    current_user = Depends(get_token_user)
+) -> Response:
     try:
-        story = await story_service.get_story(story_id, current_user.id)
-        if not story:
-            raise StoryNotFoundError(f"Story with ID {story_id} not found")
-            
-        node = next((node for node in story.nodes if node.id == node_id), None)
-        if not node:
-            raise VideoNotFoundError(f"Node with ID {node_id} not found in story {story_id}")
-            
-        return video_service.stream_video(str(story_id), str(node_id))
+        await story_service.ensure_node_exists(story_id, node_id, current_user.id)
+        return await video_service.stream_video(str(story_id), str(node_id), request.headers)
     except StoryNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except VideoNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except RangeNotSatisfiableError as e:
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{e.file_size}"})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stories/{story_id}/paths/{node_id}")
+async def stream_story_path_video(
+    story_id: UUID,
+    node_id: UUID,
+    request: Request,
+    video_service: VideoService = Depends(get_video_service),
+    story_service: StoryService = Depends(get_story_service),
+    current_user = Depends(get_token_user)
+) -> Response:
+    try:
+        path = await story_service.get_path_to_node(story_id, node_id, current_user.id)
+        return await video_service.stream_path_video(str(story_id), path, request.headers)
+    except StoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VideoNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PathVideoUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RangeNotSatisfiableError as e:
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{e.file_size}"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,33 +1,115 @@
 import os
-from fastapi.responses import StreamingResponse
-from typing import Optional
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import Mapping, Optional
 
-from config import get_video_path
-from video.exceptions import VideoNotFoundError
+from fastapi.responses import RedirectResponse, Response
+from imageio_ffmpeg import get_ffmpeg_exe
+
+from config import get_video_key, get_path_video_key, VIDEO_EXTENSION
+from story.story import PathNode, VideoQuality
+from storage.storage import Storage, StoredObject
+from video.exceptions import VideoNotFoundError, PathVideoUnavailableError
+from video.video_response import FileRangeResponse
+from utils.keyed_lock import KeyedLock
 
 class VideoService:
-    def __init__(self, base_dir: str = "output/stories"):
-        self.base_dir = base_dir
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.logger = logging.getLogger(__name__)
+        self.path_locks = KeyedLock()
 
-    def get_video_path(self, story_id: str, node_id: str) -> str:
-        return os.path.join(self.base_dir, story_id, node_id, "story.mp4")
+    async def _serve(self, key: str, filename: str, request_headers: Optional[Mapping[str, str]]) -> Response:
+        """Redirects to a signed storage URL when the backend has one, otherwise streams the local file."""
+        url = await self.storage.get_download_url(key, filename)
+        if url:
+            return RedirectResponse(url, status_code=307, headers={"Cache-Control": "private, no-store"})
 
-    def stream_video(self, story_id: str, node_id: str) -> StreamingResponse:
-        video_path = get_video_path(story_id, node_id)
-        
+        video_path = self.storage.get_local_path(key)
         if not video_path.exists():
-            raise VideoNotFoundError(f"Video not found for story {story_id}, node {node_id}")
-            
-        def iterfile():
-            with open(video_path, "rb") as f:
-                while chunk := f.read(8192):
-                    yield chunk
-                    
-        return StreamingResponse(
-            iterfile(),
-            media_type="video/mp4",
-            headers={
-                "Accept-Ranges": "bytes",
-                "Content-Disposition": f'inline; filename="story_{node_id}.mp4"'
-            }
-        ) 
\ No newline at end of file
+            raise VideoNotFoundError(f"Video {key} not found")
+
+        return FileRangeResponse(
+            video_path,
+            request_headers=request_headers,
+            media_type=f"video/{VIDEO_EXTENSION}",
+            filename=filename,
+            headers={"Cache-Control": "private, no-cache"},
+        )
+
+    async def stream_video(self, story_id: str, node_id: str, request_headers: Optional[Mapping[str, str]] = None) -> Response:
+        return await self._serve(get_video_key(story_id, node_id), f"story_{node_id}.{VIDEO_EXTENSION}", request_headers)
+
+    async def stream_path_video(self, story_id: str, path: list[PathNode], request_headers: Optional[Mapping[str, str]] = None) -> Response:
+        path_video_key = await self.get_path_video(story_id, path)
+        return await self._serve(path_video_key, f"story_path_{path[-1].id}.{VIDEO_EXTENSION}", request_headers)
+
+    def _get_path_key(self, videos: list[StoredObject]) -> str:
+        digest = hashlib.sha256()
+        for video in videos:
+            digest.update(f"{video.key}:{video.size}:{video.etag};".encode())
+        return digest.hexdigest()[:32]
+
+    async def get_path_video(self, story_id: str, path: list[PathNode]) -> str:
+        """Returns the storage key of a single video for the path, concatenating the node videos on first use.
+
+        Node videos share the same encoding parameters, so they are joined with a
+        stream copy. The cache key covers each node video's size and etag, so a node
+        whose video is re-rendered produces a new path video.
+        """
+        if not path:
+            raise VideoNotFoundError(f"Empty path for story {story_id}")
+        # Nodes rendered before video quality was recorded were encoded like full quality ones
+        if len({node.video_quality or VideoQuality.FULL for node in path}) > 1:
+            raise PathVideoUnavailableError("Path videos are only available once every node is rendered at the same quality")
+
+        video_keys = [get_video_key(story_id, str(node.id)) for node in path]
+        videos = await asyncio.gather(*[self.storage.stat(video_key) for video_key in video_keys])
+        missing = [str(node.id) for node, video in zip(path, videos) if video is None]
+        if missing:
+            raise VideoNotFoundError(f"Video not found for story {story_id}, nodes {', '.join(missing)}")
+
+        path_video_key = get_path_video_key(story_id, self._get_path_key(videos))
+        async with self.path_locks.hold(path_video_key):
+            if await self.storage.stat(path_video_key) is None:
+                await self._concatenate(video_keys, path_video_key)
+
+        return path_video_key
+
+    async def _get_input(self, key: str) -> str:
+        local_path = self.storage.get_local_path(key)
+        if local_path is not None:
+            return str(local_path.resolve())
+        return await self.storage.get_download_url(key)
+
+    async def _concatenate(self, video_keys: list[str], output_key: str) -> None:
+        self.logger.info(f"Concatenating {len(video_keys)} videos into {output_key}")
+        inputs = [await self._get_input(video_key) for video_key in video_keys]
+        fd, list_path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w") as list_file:
+            for video_input in inputs:
+                escaped_input = video_input.replace("'", "'\\''")
+                list_file.write(f"file '{escaped_input}'\n")
+
+        fd, partial_path = tempfile.mkstemp(suffix=f".{VIDEO_EXTENSION}")
+        os.close(fd)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                get_ffmpeg_exe(), "-y", "-loglevel", "error",
+                "-protocol_whitelist", "file,http,https,tcp,tls,crypto",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-c", "copy", "-movflags", "+faststart",
+                partial_path,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise PathVideoUnavailableError(f"Failed to concatenate path video: {stderr.decode(errors='replace').strip()}")
+            await self.storage.upload(output_key, partial_path, f"video/{VIDEO_EXTENSION}")
+        finally:
+            os.remove(list_path)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
@@ -0,0 +1,60 @@
+import io
+import base64
+from typing import Optional
+
+from PIL import Image
+
+class ImageAsset:
+    """A generated image decoded once, with smaller variants derived on demand.
+
+    The full resolution bytes are dropped as soon as the image is persisted, after
+    which variants are derived from the file.
+    """
+
+    VISION_MAX_SIZE = (512, 512)
+    THUMBNAIL_MAX_SIZE = (320, 180)
+
+    def __init__(self, data: bytes):
+        self.data: Optional[bytes] = data
+        self.path: Optional[str] = None
+        self.variants: dict[str, bytes] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ImageAsset":
+        image_asset = cls(None)
+        image_asset.path = path
+        return image_asset
+
+    def persist(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.data)
+        self.path = path
+        self.data = None
+
+    def _open(self) -> Image.Image:
+        if self.data is not None:
+            return Image.open(io.BytesIO(self.data))
+        return Image.open(self.path)
+
+    def _derive(self, name: str, max_size: tuple[int, int], format: str, **save_options) -> bytes:
+        if name not in self.variants:
+            with self._open() as image:
+                image = image.convert("RGB")
+                image.thumbnail(max_size)
+                output = io.BytesIO()
+                image.save(output, format=format, **save_options)
+            self.variants[name] = output.getvalue()
+        return self.variants[name]
+
+    def get_vision_image(self) -> bytes:
+        return self._derive("vision", self.VISION_MAX_SIZE, "JPEG", quality=80)
+
+    def get_vision_data_url(self) -> str:
+        return f"data:image/jpeg;base64,{base64.b64encode(self.get_vision_image()).decode('ascii')}"
+
+    def get_thumbnail(self) -> bytes:
+        return self._derive("thumbnail", self.THUMBNAIL_MAX_SIZE, "WEBP", quality=75)
+
+    def release(self) -> None:
+        self.data = None
+        self.variants.clear()
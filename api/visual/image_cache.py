@@ -0,0 +1,135 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from tti.tti import TTI, ImageGenerationOptions
+
+class ImageCache:
+    """Disk cache of decoded generated images with least-recently-used eviction.
+
+    Entries are keyed by the TTI provider that generated the image, its model, the
+    generation options and the final prompt, so any change to one of them produces a
+    new image. Since final prompts are rewritten by a language model, the prompt
+    produced for each source description is remembered too, letting a re-render land
+    on the same entry. Images and prompts share the size limit and the eviction
+    order, and files are read and written off the event loop.
+    """
+
+    def __init__(self, root: str | os.PathLike, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Path, int] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.logger = logging.getLogger(__name__)
+        self._load()
+
+    def _load(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        files = [*self.root.glob("*/*.png"), *self.root.glob("prompts/*.txt")]
+        files.sort(key=lambda path: path.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self.entries[path] = size
+            self.size_bytes += size
+
+    def _get_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.png"
+
+    def _get_prompt_path(self, description: str) -> Path:
+        key = hashlib.sha256(description.encode()).hexdigest()
+        return self.root / "prompts" / f"{key}.txt"
+
+    def _write_file(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(partial_path, path)
+
+    def _read_file(self, path: Path) -> bytes:
+        data = path.read_bytes()
+        os.utime(path)
+        return data
+
+    def _delete_files(self, paths: list[Path]) -> None:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    async def _read(self, path: Path) -> Optional[bytes]:
+        if path not in self.entries:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read_file, path)
+        except FileNotFoundError:
+            if path in self.entries:
+                self.size_bytes -= self.entries.pop(path)
+            return None
+        if path in self.entries:
+            self.entries.move_to_end(path)
+        return data
+
+    async def _write(self, path: Path, data: bytes) -> None:
+        await asyncio.to_thread(self._write_file, path, data)
+
+        if path in self.entries:
+            self.size_bytes -= self.entries.pop(path)
+        self.entries[path] = len(data)
+        self.size_bytes += len(data)
+
+        evicted = []
+        while self.size_bytes > self.max_bytes and self.entries:
+            evicted_path, size = self.entries.popitem(last=False)
+            evicted.append(evicted_path)
+            self.size_bytes -= size
+        if evicted:
+            await asyncio.to_thread(self._delete_files, evicted)
+
+    async def get_prompt(self, description: str) -> Optional[str]:
+        prompt = await self._read(self._get_prompt_path(description))
+        return prompt.decode() if prompt is not None else None
+
+    async def put_prompt(self, description: str, prompt: str) -> None:
+        await self._write(self._get_prompt_path(description), prompt.encode())
+
+    def get_key(self, tti: TTI, prompt: str, options: ImageGenerationOptions) -> str:
+        model = getattr(tti, "model", None)
+        model = getattr(model, "value", model)
+        provider = f"{type(tti).__module__}.{type(tti).__qualname__}"
+        digest = hashlib.sha256()
+        for part in (provider, str(model), options.model_dump_json(), prompt):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, keys: list[str]) -> Optional[bytes]:
+        """Returns the image stored under the first of keys that has one."""
+        for key in keys:
+            image = await self._read(self._get_path(key))
+            if image is not None:
+                self.hits += 1
+                self.bytes_saved += len(image)
+                return image
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, image: bytes) -> None:
+        await self._write(self._get_path(key), image)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
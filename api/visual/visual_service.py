@@ -1,20 +1,28 @@
 import logging
 import asyncio
 import base64
+from typing import Optional
 
-from tti.tti import TTI
+from tti.tti import TTI, ImageGenerationOptions
+from tti.hedged import Hedged
 from ttt.ttt import TTT, Chat, ChatOptions
 from script.script import Scene
 from visual.exceptions import ImageGenerationError
 from story.story import Style
-from visual.visual import Visual
+from visual.image_asset import ImageAsset
+from visual.image_cache import ImageCache
+from common.base_model_no_extra import BaseModelNoExtra
 
 from moviepy.video.VideoClip import ImageClip
 
+class SimplifiedDescriptionsResponse(BaseModelNoExtra):
+    descriptions: list[str]
+
 class VisualService:
-    def __init__(self, tti: TTI, ttt: TTT, max_concurrent_requests: int = 8):
+    def __init__(self, tti: TTI, ttt: TTT, image_cache: Optional[ImageCache] = None, max_concurrent_requests: int = 8):
         self.tti = tti
         self.ttt = ttt
+        self.image_cache = image_cache
         self.logger = logging.getLogger(__name__)
         self.semaphore = asyncio.Semaphore(max_concurrent_requests)
 
@@ -25,34 +33,126 @@ class VisualService:
 **Do not add any new elements or remove important visual features**
 '''
     
+    def _get_descriptions_simplification_prompt(self, descriptions: list[str]) -> str:
+        numbered_descriptions = '\n\n'.join([f'Description {i + 1}:\n{description}' for i, description in enumerate(descriptions)])
+        return f'''Improve each of the following descriptions so it can be used as a high-quality text-to-image prompt. Keep each one under 400 words, using plain and clear English.
+Return exactly one improved description per input description, in the same order.
+
+{numbered_descriptions}
+
+**Do not add any new elements or remove important visual features**
+'''
+
     async def _simplify_scene_description(self, description: str) -> str:
         prompt = self._get_decription_simplification_prompt(description)
         chat = Chat()
         chat.add_user_message(prompt)
         return await self.ttt.chat(chat, ChatOptions())
 
+    async def _simplify_scene_descriptions(self, descriptions: list[str]) -> list[str]:
+        prompt = self._get_descriptions_simplification_prompt(descriptions)
+        chat = Chat()
+        chat.add_user_message(prompt)
+        response: SimplifiedDescriptionsResponse = await self.ttt.chat(chat, ChatOptions(response_format=SimplifiedDescriptionsResponse))
+        if len(response.descriptions) != len(descriptions):
+            raise ValueError(f"Expected {len(descriptions)} simplified descriptions, got {len(response.descriptions)}")
+        return response.descriptions
+
+    def _format_image_generation_prompt(self, simplified_description: str, style: Style) -> str:
+        return f'''In a {style} style scene. {simplified_description}'''
+
     async def _get_image_generation_prompt(self, scene: Scene, style: Style) -> str:
         simplified_description = await self._simplify_scene_description(scene.visual_description)
-        return f'''In a {style} style scene. {simplified_description}'''
+        return self._format_image_generation_prompt(simplified_description, style)
+
+    def _get_prompt_cache_key(self, scene: Scene, style: Style) -> str:
+        return f"{style}\0{scene.visual_description}"
+
+    async def _rewrite_image_generation_prompts(self, scenes: list[Scene], style: Style) -> dict[int, str]:
+        try:
+            simplified_descriptions = await self._simplify_scene_descriptions([scene.visual_description for scene in scenes])
+            return {
+                scene.id: self._format_image_generation_prompt(simplified_description, style)
+                for scene, simplified_description in zip(scenes, simplified_descriptions)
+            }
+        except Exception as e:
+            self.logger.warning(f"Batched description simplification failed, simplifying each scene: {str(e)}")
+
+        prompts = await asyncio.gather(*[self._get_image_generation_prompt(scene, style) for scene in scenes])
+        return {scene.id: prompt for scene, prompt in zip(scenes, prompts)}
+
+    async def get_image_generation_prompts(self, scenes: list[Scene], style: Style, regenerate: bool = False) -> dict[int, str]:
+        """Rewrites every scene description with a single call, falling back to one call per scene.
+
+        Prompts already produced for a description are reused unless regenerate is set.
+        """
+        prompts = {}
+        if self.image_cache and not regenerate:
+            for scene in scenes:
+                prompt = await self.image_cache.get_prompt(self._get_prompt_cache_key(scene, style))
+                if prompt:
+                    prompts[scene.id] = prompt
+
+        missing_scenes = [scene for scene in scenes if scene.id not in prompts]
+        if missing_scenes:
+            rewritten_prompts = await self._rewrite_image_generation_prompts(missing_scenes, style)
+            if self.image_cache:
+                for scene in missing_scenes:
+                    await self.image_cache.put_prompt(self._get_prompt_cache_key(scene, style), rewritten_prompts[scene.id])
+            prompts.update(rewritten_prompts)
+
+        return prompts
+
+    def _get_providers(self) -> list[TTI]:
+        return self.tti.providers if isinstance(self.tti, Hedged) else [self.tti]
+
+    async def _generate_image(self, prompt: str, options: ImageGenerationOptions) -> tuple[str, TTI]:
+        """Returns the base64 image along with the provider that actually generated it."""
+        if isinstance(self.tti, Hedged):
+            return await self.tti.to_image_with_provider(prompt, options)
+        return await self.tti.to_image(prompt, options), self.tti
+
+    async def _get_image(self, prompt: str, regenerate: bool) -> bytes:
+        options = ImageGenerationOptions()
+        if self.image_cache and not regenerate:
+            # Any of the providers a request could go to may have generated the image
+            keys = [self.image_cache.get_key(tti, prompt, options) for tti in self._get_providers()]
+            image = await self.image_cache.get(keys)
+            if image is not None:
+                self.logger.info(f"Image cache hit, stats: {self.image_cache.stats()}")
+                return image
+
+        async with self.semaphore:
+            self.logger.info(f"Generating image with prompt: {prompt}")
+            base64_image, provider = await self._generate_image(prompt, options)
+        if not base64_image:
+            raise ImageGenerationError("Empty response from TTI")
+
+        image = base64.b64decode(base64_image)
+        if self.image_cache:
+            await self.image_cache.put(self.image_cache.get_key(provider, prompt, options), image)
+        return image
     
-    async def generate_scene_visual(self, scene: Scene, style: Style, image_file_path: str) -> Visual:
+    def open_image_clip(self, image_file_path: str) -> ImageClip:
+        options = ImageGenerationOptions()
+        clip = ImageClip(image_file_path)
+        if tuple(clip.size) != (options.width, options.height):
+            clip = clip.resized(new_size=(options.width, options.height))
+        return clip
+
+    async def generate_scene_image(self, scene: Scene, style: Style, image_file_path: str, prompt: str = None, regenerate: bool = False) -> ImageAsset:
         try:
-            async with self.semaphore:
+            if not prompt:
                 prompt = await self._get_image_generation_prompt(scene, style)
 
-                self.logger.info(f"Generating image for scene {scene.id} with prompt: {prompt}")
-                base64_image = await self.tti.to_image(prompt)
-                if not base64_image:
-                    raise ImageGenerationError("Empty response from TTI")
-                
-                with open(image_file_path, "wb") as f:
-                    f.write(base64.b64decode(base64_image))
-                
-                self.logger.info(f"Saved image file to {image_file_path}")
-
-                return Visual(
-                    clip=ImageClip(image_file_path),
-                    base64_image=base64_image
-                )
+            self.logger.info(f"Getting image for scene {scene.id}")
+            image = await self._get_image(prompt, regenerate)
+
+            image_asset = ImageAsset(image)
+            image_asset.persist(image_file_path)
+            del image
+
+            self.logger.info(f"Saved image file to {image_file_path}")
+            return image_asset
         except Exception as e:
             raise ImageGenerationError(f"Failed to generate image: {str(e)}")
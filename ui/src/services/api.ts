@@ -56,15 +56,26 @@ export class ApiService {
   }
 
   async listStories(): Promise<Story[]> {
-    const response = await fetch(`${API_BASE_URL}/stories`, {
-      headers: this.getHeaders(),
-    });
-
-    if (!response.ok) {
-      throw new Error('Failed to list stories');
-    }
-
-    return response.json();
+    const stories: Story[] = [];
+    let cursor: string | null = null;
+    do {
+      const params = new URLSearchParams({ limit: '100' });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${API_BASE_URL}/stories?${params}`, {
+        headers: this.getHeaders(),
+      });
+
+      if (!response.ok) {
+        throw new Error('Failed to list stories');
+      }
+
+      const page = await response.json();
+      stories.push(...page.stories);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return stories;
   }
 
   async deleteStory(storyId: string): Promise<void> {